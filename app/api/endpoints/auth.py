@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_session
+from app.core.security import get_current_user, token_service
+from app.schemas.auth import LoginRequest, Token, TokenInfo
+from app.crud import user as crud_user
+
+router = APIRouter()
+
+# Vérifie email et mot de passe, renvoie un jeton d'accès signé.
+@router.post("/auth/login", response_model=Token)
+async def login(credentials: LoginRequest, db: AsyncSession = Depends(get_session)):
+    user = await crud_user.authenticate_user(db, email=credentials.email, password=credentials.password)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password.", headers={"WWW-Authenticate": "Bearer"})
+    access_token, _ = token_service.issue(user.id)
+    return Token(access_token=access_token, expires_in=token_service.ttl)
+
+# Vérifie le jeton Bearer (sans base ni hachage).
+@router.get("/auth/verify", response_model=TokenInfo)
+async def verify(claims: tuple = Depends(get_current_user)):
+    user_id, expires_at = claims
+    return TokenInfo(user_id=user_id, expires_at=expires_at)
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 from uuid import UUID 
 
-from app.core.database import get_db
+from app.core import batch, bulk, export, search, serialization
+from app.core.cache import response_cache
+from app.core.conditional import conditional
+from app.core.counts import count_service
+from app.core.database import get_read_session, get_session
+from app.core.pagination import encode_cursor, decode_cursor, get_total_pages
 from app.models.customer import Customer as CustomerModel
-from app.models.invoice import Invoice as InvoiceModel
-from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerPagesResponse, Customer
+from app.models.customer_summary import CustomerSummary as CustomerSummaryModel
+from app.schemas.batch import BatchRequest, CustomerBatch
+from app.schemas.bulk import BulkResponse
+from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerListItem, CustomerPage, CustomerPagesResponse, Customer
 from app.crud import customer as crud_customer
 
 router = APIRouter()
@@ -16,125 +23,246 @@ router = APIRouter()
 # Valeur utilisée pour les call api 'brut' (Insomnia).
 ITEMS_PER_PAGE = 10 
 
+# Champs des lignes de liste (client et agrégats), dans l'ordre de la réponse.
+CUSTOMER_LIST_FIELDS = serialization.schema_fields(CustomerListItem)
+# Champs lus dans customer_summaries (jointure évitée si aucun n'est demandé).
+CUSTOMER_SUMMARY_FIELDS = ("total_invoices", "total_pending", "total_paid")
+CUSTOMER_LIST_COLUMNS = {
+    "id": CustomerModel.id,
+    "name": CustomerModel.name,
+    "email": CustomerModel.email,
+    "image_url": CustomerModel.image_url,
+    "total_invoices": func.coalesce(CustomerSummaryModel.total_invoices, 0),
+    "total_pending": func.coalesce(CustomerSummaryModel.total_pending, 0),
+    "total_paid": func.coalesce(CustomerSummaryModel.total_paid, 0),
+}
+
+def customers_list_query(fields: tuple = CUSTOMER_LIST_FIELDS):
+    customers_query = select(*serialization.columns_for(fields, CUSTOMER_LIST_COLUMNS)).select_from(CustomerModel)
+    if any(field in CUSTOMER_SUMMARY_FIELDS for field in fields):
+        customers_query = customers_query.outerjoin(
+            CustomerSummaryModel, CustomerSummaryModel.customer_id == CustomerModel.id
+        )
+    return customers_query
+
+# Nombre de clients correspondant au filtre de recherche.
+def customers_count_query(search_filter):
+    return select(func.count(CustomerModel.id)).where(search_filter)
+
+# Requête de comptage pour le service de comptage (filtre construit seulement sur un miss).
+def customers_count_builder(db):
+    async def build(query):
+        return customers_count_query(await search.customer_filter(db, query))
+    return build
+
 # Récupère tous les clients.
-@router.get("/customers", response_model=list)
-def get_customers(
-    db: Session = Depends(get_db),
+# ?fields=id,name : seules ces colonnes sont sélectionnées et renvoyées, sans jointure
+# sur customer_summaries si aucun total n'est demandé.
+@router.get("/customers", response_model=Union[CustomerPage, list], dependencies=[conditional("customers", "customer_summaries")])
+async def get_customers(
+    response: Response,
+    db: AsyncSession = Depends(get_read_session),
     query: str = Query("", alias="query"),
     page: int = Query(1, alias="page"),
-    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50)
+    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50),
+    cursor: Optional[str] = Query(None, alias="cursor"),
+    total: bool = Query(False, alias="total"),
+    envelope: bool = Query(False, alias="envelope"),
+    fields: Optional[str] = Query(None, alias="fields")
 ):  
-    # Calcul de l'offset pour la pagination.
-    offset = (page - 1) * limit
+    with_total = total or envelope
+    selected = serialization.parse_fields(fields, CustomerListItem)
+    search_filter = await search.customer_filter(db, query)
 
     # Construire la requête principale avec les filtres.
-    customers_query = db.query(
-        CustomerModel.id,
-        CustomerModel.name,
-        CustomerModel.email,
-        CustomerModel.image_url,
-        func.count(InvoiceModel.id).label("total_invoices"),
-        func.coalesce(func.sum(InvoiceModel.amount).filter(InvoiceModel.status == "pending"), 0).label("total_pending"),
-        func.coalesce(func.sum(InvoiceModel.amount).filter(InvoiceModel.status == "paid"), 0).label("total_paid"),
-    ).outerjoin(InvoiceModel, InvoiceModel.customer_id == CustomerModel.id)\
-     .group_by(CustomerModel.id, CustomerModel.name, CustomerModel.email, CustomerModel.image_url)\
-     .filter(
-         (CustomerModel.name.ilike(f"%{query}%")) |
-         (CustomerModel.email.ilike(f"%{query}%"))
-     )\
-     .order_by(CustomerModel.name.asc())\
-     .offset(offset)\
-     .limit(limit)
+    customers_query = customers_list_query(selected)\
+        .where(search_filter)\
+        .order_by(CustomerModel.name.asc(), CustomerModel.id.asc())
+
+    if with_total:
+        # Total calculé dans la même requête (sous-requête non corrélée, évaluée une fois).
+        customers_query = customers_query.add_columns(
+            customers_count_query(search_filter).correlate(None).scalar_subquery().label("total_items")
+        )
+
+    if cursor is None:
+        # Calcul de l'offset pour la pagination.
+        customers_query = customers_query.offset((page - 1) * limit).limit(limit)
+    else:
+        # Pagination par curseur : seek sur la clé de tri (name, id).
+        # Un curseur vide demande la première page.
+        if cursor:
+            cursor_name, cursor_id = decode_cursor(cursor, str, UUID)
+            customers_query = customers_query.where(
+                tuple_(CustomerModel.name, CustomerModel.id) > (cursor_name, cursor_id)
+            )
+        # Une ligne de plus pour savoir s'il existe une page suivante ; clé de tri
+        # sélectionnée en fin de ligne, même si `fields` ne la demande pas.
+        customers_query = customers_query.add_columns(
+            CustomerModel.name.label("cursor_name"), CustomerModel.id.label("cursor_id")
+        ).limit(limit + 1)
 
     # Exécuter la requête.
-    all_customers = customers_query.all()
+    all_customers = (await db.execute(customers_query)).all()
 
-    # Vérifier si aucun client n'est trouvé.
-    if not all_customers:
-        return []
+    next_cursor = None
+    if cursor is not None and len(all_customers) > limit:
+        all_customers = all_customers[:limit]
+        last_customer = all_customers[-1]
+        next_cursor = encode_cursor(last_customer.cursor_name, last_customer.cursor_id)
+        response.headers["X-Next-Cursor"] = next_cursor
 
     # Retourner les résultats.
-    return [
-        {
-            "id": customer.id,
-            "name": customer.name,
-            "email": customer.email,
-            "image_url": customer.image_url,
-            "total_invoices": customer.total_invoices,
-            "total_pending": customer.total_pending,
-            "total_paid": customer.total_paid,
-        }
-        for customer in all_customers
-    ]
+    items = serialization.rows_to_items(selected, all_customers)
+    sparse = serialization.sparse_adapter(CustomerListItem, selected)
+
+    if not with_total:
+        return serialization.render(items, response, sparse)
+
+    if all_customers:
+        total_items = all_customers[0].total_items
+    elif cursor or page > 1:
+        # Page vide au-delà de la fin : le total n'est pas porté par une ligne.
+        total_items = await db.scalar(customers_count_query(search_filter))
+    else:
+        total_items = 0
+    total_pages = get_total_pages(total_items, limit)
+
+    response.headers["X-Total-Count"] = str(total_items)
+    response.headers["X-Total-Pages"] = str(total_pages)
+    if not envelope:
+        return serialization.render(items, response, sparse)
+    return serialization.render(
+        {"items": items, "totalItems": total_items, "totalPages": total_pages, "nextCursor": next_cursor},
+        response,
+        sparse,
+    )
 
 # Récupère le nombre total de pages.
-@router.get("/customers/pages", response_model=CustomerPagesResponse)
-def get_customers_pages(
-    db: Session = Depends(get_db),
+@router.get("/customers/pages", response_model=CustomerPagesResponse, dependencies=[conditional("customers")])
+async def get_customers_pages(
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
     query: str = Query("", alias="query"),
-    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50)
+    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50),
+    approx: bool = Query(False, alias="approx")
 ):
-    total_items = db.query(CustomerModel)\
-        .filter(
-            (CustomerModel.name.ilike(f"%{query}%")) |
-            (CustomerModel.email.ilike(f"%{query}%"))
-        ).count()
+    total_items, _ = await count_service.count(
+        request, db, "customers.pages", ("customers",), query, customers_count_builder(db), approx=approx
+    )
 
-    total_pages = (total_items + limit - 1) // limit
+    total_pages = get_total_pages(total_items, limit)
 
     return CustomerPagesResponse(totalPages=total_pages)
 
-# Récupère la liste de tous les clients.
-@router.get("/customers/all", response_model=List[Customer])
-def get_all_customers(db: Session = Depends(get_db)):
-    customers = db.query(CustomerModel).order_by(CustomerModel.name.asc()).all()
-    return customers
+# Récupère la liste de tous les clients (?fields= comme pour /customers).
+@router.get("/customers/all", response_model=List[Customer], dependencies=[conditional("customers")])
+async def get_all_customers(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_session),
+    fields: Optional[str] = Query(None, alias="fields")
+):
+    selected = serialization.parse_fields(fields, Customer)
+
+    async def load():
+        result = await db.execute(
+            select(*serialization.columns_for(selected, CUSTOMER_LIST_COLUMNS))
+            .order_by(CustomerModel.name.asc())
+        )
+        return serialization.rows_to_items(selected, result.all())
+
+    return serialization.render(
+        await response_cache.get_or_load(request, ("customers",), load),
+        response,
+        serialization.sparse_adapter(Customer, selected),
+    )
 
 # Récupère le nombre total de clients.
-@router.get("/customers/count", response_model=dict)
-def get_customer_count(query: Optional[str] = "", db: Session = Depends(get_db)):
+# approx=true (sans query) : estimation des statistiques PostgreSQL, sans parcours.
+@router.get("/customers/count", response_model=dict, dependencies=[conditional("customers")])
+async def get_customer_count(
+    request: Request,
+    query: Optional[str] = "",
+    approx: bool = Query(False, alias="approx"),
+    db: AsyncSession = Depends(get_read_session)
+):
     try:
-        # Construire la requête principale.
-        base_query = db.query(CustomerModel.id).distinct()
-
-        # Appliquer les filtres si la query est présente.
-        if query:
-            base_query = base_query.filter(
-                (CustomerModel.name.ilike(f"%{query}%")) |
-                (CustomerModel.email.ilike(f"%{query}%"))
-            )
-        
         # Compter le nombre total de clients correspondants.
-        count = base_query.count()
-        return {"count": count}
+        count, approximate = await count_service.count(
+            request, db, "customers.count", ("customers",), query, customers_count_builder(db), approx=approx
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal Server Error")
+    return {"count": count, "approx": True} if approximate else {"count": count}
+
+# Exporte les clients (CSV ou NDJSON) en flux, avec le même filtre que la liste.
+# Compressé en gzip si le client l'accepte.
+@router.get("/customers/export")
+async def export_customers(
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
+    query: str = Query("", alias="query"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$")
+):
+    search_filter = await search.customer_filter(db, query)
+    export_query = customers_list_query()\
+        .where(search_filter)\
+        .order_by(CustomerModel.name.asc(), CustomerModel.id.asc())
+    return export.export_response(request, export_query, export_format, "customers")
+
+# Récupère plusieurs clients en une requête : ?ids=a,b,c (ou ids répété), dans l'ordre demandé.
+@router.get("/customers/batch", response_model=CustomerBatch, dependencies=[conditional("customers")])
+async def get_customers_batch(ids: List[str] = Query(..., alias="ids"), db: AsyncSession = Depends(get_read_session)):
+    return await batch.fetch_batch(db, CustomerModel, batch.parse_ids(ids))
+
+# Même lecture groupée, identifiants dans le corps (listes trop longues pour une URL).
+@router.post("/customers/batch", response_model=CustomerBatch)
+async def post_customers_batch(body: BatchRequest, db: AsyncSession = Depends(get_read_session)):
+    return await batch.fetch_batch(db, CustomerModel, batch.unique_ids(body.ids))
 
 # Récupère un client spécifique par son identifiant.
-@router.get("/customers/{customer_id}", response_model=Customer)
-def get_one_customer(customer_id: UUID, db: Session = Depends(get_db)):
-    try:
-        customer = db.query(CustomerModel).filter(CustomerModel.id == customer_id).first()
-        if not customer:
-            raise HTTPException(status_code=404, detail="Customer not found")
-        return customer
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+@router.get("/customers/{customer_id}", response_model=Customer, dependencies=[conditional("customers")])
+async def get_one_customer(customer_id: UUID, db: AsyncSession = Depends(get_read_session)):
+    result = await db.execute(select(CustomerModel).where(CustomerModel.id == customer_id))
+    customer = result.scalars().first()
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return customer
 
 # Crée un nouveau client.
 @router.post("/customers", response_model=Customer)
-def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
+async def create_customer(customer: CustomerCreate, db: AsyncSession = Depends(get_session)):
     try:
         # Appeler la fonction CRUD
-        return crud_customer.create_customer(db=db, customer=customer)
+        return await crud_customer.create_customer(db=db, customer=customer)
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+# Crée des clients en masse (tableau JSON ou NDJSON), une transaction par lot.
+# Les emails déjà présents sont signalés comme doublons.
+@router.post("/customers/bulk", response_model=BulkResponse)
+async def bulk_create_customers(request: Request, db: AsyncSession = Depends(get_session)):
+    results = []
+    try:
+        async for chunk in bulk.iter_chunks(request):
+            valid, invalid = bulk.validate_chunk(CustomerCreate, chunk)
+            results += invalid
+            if valid:
+                results += await crud_customer.bulk_create_customers(db=db, customers=valid)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal Server Error")
+    return bulk.summarize(results)
 
 # Met à jour un client existant.
 @router.patch("/customers/{customer_id}", response_model=Customer)
-def update_customer(customer_id: str, customer: CustomerUpdate, db: Session = Depends(get_db)):
-    updated_customer = crud_customer.update_customer(db=db, customer_id=customer_id, customer_data=customer)
+async def update_customer(customer_id: UUID, customer: CustomerUpdate, db: AsyncSession = Depends(get_session)):
+    updated_customer = await crud_customer.update_customer(db=db, customer_id=customer_id, customer_data=customer)
     if not updated_customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return updated_customer
\ No newline at end of file
+    return updated_customer
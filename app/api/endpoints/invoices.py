@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, String, cast
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Union
 from uuid import UUID 
+from datetime import date
 
-from app.core.database import get_db
+from app.core import batch, bulk, export, search, serialization
+from app.core.cache import response_cache
+from app.core.conditional import conditional
+from app.core.counts import count_service
+from app.core.config import settings
+from app.core.database import get_read_session, get_session, session_scope
+from app.core.events import Debounced, EventStreamResponse, invoice_events, sse_message
+from app.core.pagination import encode_cursor, decode_cursor, get_total_pages
+from app.core.series import SeriesRange, series_payload, series_query
 from app.models.invoice import Invoice as InvoiceModel
 from app.models.customer import Customer as CustomerModel
-from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceLatest, InvoicePagesResponse, Invoice
+from app.schemas.batch import BatchRequest, InvoiceBatch
+from app.schemas.bulk import BulkResponse
+from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceLatest, InvoicePage, InvoicePagesResponse, InvoiceSeries, Invoice
 from app.crud import invoice as crud_invoice
 
 router = APIRouter()
@@ -16,153 +27,330 @@ router = APIRouter()
 # Valeur utilisée pour les call api 'brut' (Insomnia).
 ITEMS_PER_PAGE = 10
 
+# Colonnes des lignes de liste, sélectionnées dans l'ordre des champs d'InvoiceLatest.
+INVOICE_LIST_COLUMNS = {
+    "id": InvoiceModel.id,
+    "customer_id": InvoiceModel.customer_id,
+    "status": InvoiceModel.status,
+    "amount": InvoiceModel.amount,
+    "name": CustomerModel.name,
+    "email": CustomerModel.email,
+    "image_url": CustomerModel.image_url,
+    "date": InvoiceModel.date,
+}
+
+# Champs lus dans customers (jointure évitée si aucun n'est demandé).
+INVOICE_CUSTOMER_FIELDS = ("name", "email", "image_url")
+
+def invoices_list_query(fields: tuple = None, with_customer: bool = False):
+    # `with_customer` : jointure gardée pour le filtre de recherche (nom, email du client).
+    fields = fields or serialization.schema_fields(InvoiceLatest)
+    invoices_query = select(*serialization.columns_for(fields, INVOICE_LIST_COLUMNS)).select_from(InvoiceModel)
+    if with_customer or any(field in INVOICE_CUSTOMER_FIELDS for field in fields):
+        invoices_query = invoices_query.join(CustomerModel, InvoiceModel.customer_id == CustomerModel.id)
+    return invoices_query
+
+# Nombre de factures correspondant au filtre de recherche.
+def invoices_count_query(search_filter):
+    return select(func.count(InvoiceModel.id))\
+        .join(CustomerModel, InvoiceModel.customer_id == CustomerModel.id)\
+        .where(search_filter)
+
 # Récupère toutes les factures.
-@router.get("/invoices", response_model=list[InvoiceLatest])
-def get_all_invoices(
-    db: Session = Depends(get_db),
+# ?fields=id,amount : seules ces colonnes sont sélectionnées et renvoyées, sans jointure
+# sur customers si aucun champ client n'est demandé (ni recherche).
+@router.get("/invoices", response_model=Union[InvoicePage, list[InvoiceLatest]], dependencies=[conditional("invoices", "customers")])
+async def get_all_invoices(
+    response: Response,
+    db: AsyncSession = Depends(get_read_session),
     query: str = Query("", alias="query"),
     page: int = Query(1, alias="page"),
-    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50)
+    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50),
+    cursor: Optional[str] = Query(None, alias="cursor"),
+    total: bool = Query(False, alias="total"),
+    envelope: bool = Query(False, alias="envelope"),
+    fields: Optional[str] = Query(None, alias="fields")
 ):
-    # Calculer l'offset
-    offset = (page - 1) * limit
+    with_total = total or envelope
+    selected = serialization.parse_fields(fields, InvoiceLatest)
+    search_filter = await search.invoice_filter(db, query)
 
-    # Construire la requête avec filtre, limite et offset.
-    invoices_query = db.query(InvoiceModel, CustomerModel)\
-        .join(CustomerModel, InvoiceModel.customer_id == CustomerModel.id)\
-        .filter(
-            (CustomerModel.name.ilike(f"%{query}%")) |
-            (CustomerModel.email.ilike(f"%{query}%")) |
-            (InvoiceModel.status.ilike(f"%{query}%")) |
-            (func.cast(InvoiceModel.amount, String).ilike(f"%{query}%"))
-        )\
-        .order_by(InvoiceModel.date.desc(), InvoiceModel.id.desc())\
-        .offset(offset)\
-        .limit(limit)
+    # Construire la requête avec filtre et limite.
+    invoices_query = invoices_list_query(selected, with_customer=bool(query.strip()))\
+        .where(search_filter)\
+        .order_by(InvoiceModel.date.desc(), InvoiceModel.id.desc())
+
+    if with_total:
+        # Total calculé dans la même requête (sous-requête non corrélée, évaluée une fois).
+        invoices_query = invoices_query.add_columns(
+            invoices_count_query(search_filter).correlate(None).scalar_subquery().label("total_items")
+        )
+
+    if cursor is None:
+        # Pagination par page : offset calculé.
+        invoices_query = invoices_query.offset((page - 1) * limit).limit(limit)
+    else:
+        # Pagination par curseur : seek sur la clé de tri (date desc, id desc).
+        # Un curseur vide demande la première page.
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(cursor, date.fromisoformat, UUID)
+            invoices_query = invoices_query.where(
+                tuple_(InvoiceModel.date, InvoiceModel.id) < (cursor_date, cursor_id)
+            )
+        # Une ligne de plus pour savoir s'il existe une page suivante ; clé de tri
+        # sélectionnée en fin de ligne, même si `fields` ne la demande pas.
+        invoices_query = invoices_query.add_columns(
+            InvoiceModel.date.label("cursor_date"), InvoiceModel.id.label("cursor_id")
+        ).limit(limit + 1)
 
     # Récupérer les résultats.
-    all_invoices = invoices_query.all()
+    all_invoices = (await db.execute(invoices_query)).all()
 
-    # Vérifier si aucune facture n'est trouvée.
-    if not all_invoices:
-        return []
+    next_cursor = None
+    if cursor is not None and len(all_invoices) > limit:
+        all_invoices = all_invoices[:limit]
+        last_invoice = all_invoices[-1]
+        next_cursor = encode_cursor(last_invoice.cursor_date, last_invoice.cursor_id)
+        response.headers["X-Next-Cursor"] = next_cursor
 
     # Retourner les résultats formatés.
-    return [
-        {
-            "id": invoice.id,
-            "customer_id": invoice.customer_id,
-            "status": invoice.status,
-            "amount": invoice.amount,
-            "name": customer.name,
-            "email": customer.email,
-            "image_url": customer.image_url,
-            "date": invoice.date.isoformat(),
-        }
-        for invoice, customer in all_invoices
-    ]
+    items = serialization.rows_to_items(selected, all_invoices)
+    sparse = serialization.sparse_adapter(InvoiceLatest, selected)
+
+    if not with_total:
+        return serialization.render(items, response, sparse)
+
+    if all_invoices:
+        total_items = all_invoices[0].total_items
+    elif cursor or page > 1:
+        # Page vide au-delà de la fin : le total n'est pas porté par une ligne.
+        total_items = await db.scalar(invoices_count_query(search_filter))
+    else:
+        total_items = 0
+    total_pages = get_total_pages(total_items, limit)
+
+    response.headers["X-Total-Count"] = str(total_items)
+    response.headers["X-Total-Pages"] = str(total_pages)
+    if not envelope:
+        return serialization.render(items, response, sparse)
+    return serialization.render(
+        {"items": items, "totalItems": total_items, "totalPages": total_pages, "nextCursor": next_cursor},
+        response,
+        sparse,
+    )
 
 # Récupère le nombre total de pages.
-@router.get("/invoices/pages", response_model=InvoicePagesResponse)
-def get_invoices_pages(
-    db: Session = Depends(get_db),
+@router.get("/invoices/pages", response_model=InvoicePagesResponse, dependencies=[conditional("invoices", "customers")])
+async def get_invoices_pages(
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
     query: str = Query("", alias="query"),
-    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50)
+    limit: int = Query(ITEMS_PER_PAGE, alias="limit", le=50),
+    approx: bool = Query(False, alias="approx")
 ):
-    total_items = db.query(InvoiceModel)\
-        .join(CustomerModel, InvoiceModel.customer_id == CustomerModel.id)\
-        .filter(
-            (CustomerModel.name.ilike(f"%{query}%")) |
-            (CustomerModel.email.ilike(f"%{query}%")) |
-            (InvoiceModel.status.ilike(f"%{query}%")) |
-            (func.cast(InvoiceModel.amount, String).ilike(f"%{query}%"))
-        ).count()
+    async def build(query):
+        return invoices_count_query(await search.invoice_filter(db, query))
 
-    total_pages = (total_items + limit - 1) // limit
+    total_items, _ = await count_service.count(
+        request, db, "invoices.pages", ("invoices", "customers"), query, build, approx=approx
+    )
+
+    total_pages = get_total_pages(total_items, limit)
 
     return InvoicePagesResponse(totalPages=total_pages)
 
 # Récupère le nombre total de factures.
-@router.get("/invoices/count", response_model=dict)
-def get_invoices_count(query: Optional[str] = "", db: Session = Depends(get_db)):
-    try:
+# approx=true (sans query) : estimation des statistiques PostgreSQL, sans parcours.
+@router.get("/invoices/count", response_model=dict, dependencies=[conditional("invoices")])
+async def get_invoices_count(
+    request: Request,
+    query: Optional[str] = "",
+    approx: bool = Query(False, alias="approx"),
+    db: AsyncSession = Depends(get_read_session)
+):
+    async def build(query):
         # Construire la requête principale.
-        base_query = db.query(InvoiceModel.id)
+        base_query = select(func.count(InvoiceModel.id))
 
         # Appliquer les filtres si la query est présente.
         if query:
-            base_query = base_query.filter(
-                (InvoiceModel.status.ilike(f"%{query}%")) |
-                (cast(InvoiceModel.amount, String).ilike(f"%{query}%"))
+            base_query = base_query.where(
+                await search.invoice_filter(db, query, with_customer=False)
             )
-        
-        # Retourner le nombre total.
-        return {"count": base_query.count()}
+        return base_query
+
+    try:
+        count, approximate = await count_service.count(
+            request, db, "invoices.count", ("invoices",), query, build, approx=approx
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal Server Error")
+    # Retourner le nombre total.
+    return {"count": count, "approx": True} if approximate else {"count": count}
 
 # Récupère les montants des factures payées et en attente.
-@router.get("/invoices/status", response_model=dict)
-def get_invoices_status(db: Session = Depends(get_db)):
+@router.get("/invoices/status", response_model=dict, dependencies=[conditional("invoices")])
+async def get_invoices_status(request: Request, db: AsyncSession = Depends(get_read_session)):
+    async def load():
+        return await crud_invoice.status_totals(db)
+
     try:
-        paid_amount = db.query(func.sum(InvoiceModel.amount)) \
-                        .filter(InvoiceModel.status == 'paid') \
-                        .scalar() or 0
-        pending_amount = db.query(func.sum(InvoiceModel.amount)) \
-                        .filter(InvoiceModel.status == 'pending') \
-                        .scalar() or 0
-        return {"paid": paid_amount, "pending": pending_amount}
+        return await response_cache.get_or_load(request, ("invoices",), load)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+# Nombre et montant des factures par période (?from=&to=&granularity=), filtrables par statut.
+@router.get("/invoices/series", response_model=InvoiceSeries, dependencies=[conditional("invoices")])
+async def get_invoices_series(
+    request: Request,
+    series: SeriesRange = Depends(),
+    status: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_session),
+):
+    async def load():
+        query = series_query(InvoiceModel.date, [func.count(), func.sum(InvoiceModel.amount)], series)
+        if status:
+            query = query.where(InvoiceModel.status == status)
+        return series_payload(series, (await db.execute(query)).all(), ("count", "amount"))
+
+    return await response_cache.get_or_load(request, ("invoices",), load)
+
 # Récupère les 5 dernières factures avec les informations du client associé.
-@router.get("/invoices/latest", response_model=list[InvoiceLatest])
-def get_latest_invoices(db: Session = Depends(get_db)):
-    latest_invoices = db.query(InvoiceModel, CustomerModel)\
-                        .join(CustomerModel, InvoiceModel.customer_id == CustomerModel.id)\
-                        .order_by(InvoiceModel.date.desc())\
-                        .limit(5)\
-                        .all()
-
-    if not latest_invoices:
-        raise HTTPException(status_code=404, detail="No invoices found.")
-
-    return [
-        {
-            "id": invoice.id,
-            "customer_id": invoice.customer_id,
-            "status": invoice.status,
-            "amount": invoice.amount,
-            "name": customer.name,
-            "email": customer.email,
-            "image_url": customer.image_url,
-            "date": invoice.date.isoformat(),
-        }
-        for invoice, customer in latest_invoices  # Décomposition du tuple.
-    ]
+@router.get("/invoices/latest", response_model=list[InvoiceLatest], dependencies=[conditional("invoices", "customers")])
+async def get_latest_invoices(request: Request, response: Response, db: AsyncSession = Depends(get_read_session)):
+    async def load():
+        latest_invoices = (await db.execute(
+            invoices_list_query()
+            .order_by(InvoiceModel.date.desc())
+            .limit(5)
+        )).all()
+
+        if not latest_invoices:
+            raise HTTPException(status_code=404, detail="No invoices found.")
+
+        return serialization.rows_to_items(InvoiceLatest, latest_invoices)
+
+    return serialization.render(
+        await response_cache.get_or_load(request, ("invoices", "customers"), load), response
+    )
+
+# Exporte les factures (CSV ou NDJSON) en flux, avec le même filtre que la liste.
+# Compressé en gzip si le client l'accepte.
+@router.get("/invoices/export")
+async def export_invoices(
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
+    query: str = Query("", alias="query"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$")
+):
+    search_filter = await search.invoice_filter(db, query)
+    export_query = select(
+        InvoiceModel.id,
+        InvoiceModel.customer_id,
+        InvoiceModel.status,
+        InvoiceModel.amount,
+        CustomerModel.name,
+        CustomerModel.email,
+        CustomerModel.image_url,
+        InvoiceModel.date,
+    ).join(CustomerModel, InvoiceModel.customer_id == CustomerModel.id)\
+     .where(search_filter)\
+     .order_by(InvoiceModel.date.desc(), InvoiceModel.id.desc())
+    return export.export_response(request, export_query, export_format, "invoices")
+
+# Totaux poussés aux abonnés du worker au plus une fois par EVENTS_STATUS_DEBOUNCE_SECONDS,
+# quel que soit le nombre d'écritures et d'abonnés.
+async def refresh_status():
+    if not invoice_events.subscribers:
+        return
+    async with session_scope() as db:
+        totals = await crud_invoice.status_totals(db)
+    invoice_events.deliver({"type": "status", **totals})
+
+status_refresh = Debounced(settings.EVENTS_STATUS_DEBOUNCE_SECONDS, refresh_status)
+invoice_events.add_listener(lambda event: status_refresh.schedule() if event["type"] != "status" else None)
+
+# Flux Server-Sent Events des écritures de factures (invoice.created, invoice.updated,
+# invoices.created pour un import) et des totaux (status, envoyé aussi à la connexion).
+# "resync" : le client a pris trop de retard, il doit recharger ses données.
+@router.get("/invoices/stream")
+async def stream_invoices():
+    subscriber = invoice_events.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many subscribers.", headers={"Retry-After": "5"})
+    try:
+        await invoice_events.ensure_listening()
+    except BaseException:
+        # Pas de réponse, donc pas de désabonnement par EventStreamResponse.
+        invoice_events.unsubscribe(subscriber)
+        raise
+
+    async def events():
+        async with session_scope() as db:
+            totals = await crud_invoice.status_totals(db)
+        yield sse_message({"type": "status", **totals})
+        while True:
+            event = await subscriber.next(settings.EVENTS_KEEPALIVE_SECONDS)
+            if event is None:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxies.
+                await invoice_events.ensure_listening()
+                yield b": keepalive\n\n"
+                continue
+            yield sse_message(event)
+            if event["type"] == "reconnect":
+                break
+
+    return EventStreamResponse(events(), invoice_events, subscriber)
+
+# Récupère plusieurs factures en une requête : ?ids=a,b,c (ou ids répété), dans l'ordre demandé.
+@router.get("/invoices/batch", response_model=InvoiceBatch, dependencies=[conditional("invoices")])
+async def get_invoices_batch(ids: list[str] = Query(..., alias="ids"), db: AsyncSession = Depends(get_read_session)):
+    return await batch.fetch_batch(db, InvoiceModel, batch.parse_ids(ids))
+
+# Même lecture groupée, identifiants dans le corps (listes trop longues pour une URL).
+@router.post("/invoices/batch", response_model=InvoiceBatch)
+async def post_invoices_batch(body: BatchRequest, db: AsyncSession = Depends(get_read_session)):
+    return await batch.fetch_batch(db, InvoiceModel, batch.unique_ids(body.ids))
 
 # Récupère une facture spécifique par son identifiant.
-@router.get("/invoices/{invoice_id}", response_model=Invoice)
-def get_one_invoice(invoice_id: UUID, db: Session = Depends(get_db)):
-    invoice = db.query(InvoiceModel).filter(InvoiceModel.id == invoice_id).first()
+@router.get("/invoices/{invoice_id}", response_model=Invoice, dependencies=[conditional("invoices")])
+async def get_one_invoice(invoice_id: UUID, db: AsyncSession = Depends(get_read_session)):
+    result = await db.execute(select(InvoiceModel).where(InvoiceModel.id == invoice_id))
+    invoice = result.scalars().first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return invoice
 
 # Crée une nouvelle facture.
 @router.post("/invoices", response_model=Invoice)
-def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db)):
+async def create_invoice(invoice: InvoiceCreate, db: AsyncSession = Depends(get_session)):
     try:
         # Appeler la fonction CRUD
-        return crud_invoice.create_invoice(db=db, invoice=invoice)
+        return await crud_invoice.create_invoice(db=db, invoice=invoice)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error.")
 
+# Crée des factures en masse (tableau JSON ou NDJSON), une transaction par lot.
+@router.post("/invoices/bulk", response_model=BulkResponse)
+async def bulk_create_invoices(request: Request, db: AsyncSession = Depends(get_session)):
+    results = []
+    try:
+        async for chunk in bulk.iter_chunks(request):
+            valid, invalid = bulk.validate_chunk(InvoiceCreate, chunk)
+            results += invalid
+            if valid:
+                results += await crud_invoice.bulk_create_invoices(db=db, invoices=valid)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal server error.")
+    return bulk.summarize(results)
+
 # Met à jour une facture existante.
 @router.patch("/invoices/{invoice_id}", response_model=Invoice)
-def update_invoice(invoice_id: str, invoice: InvoiceUpdate, db: Session = Depends(get_db)):
-    updated_invoice = crud_invoice.update_invoice(db=db, invoice_id=invoice_id, invoice_data=invoice)
+async def update_invoice(invoice_id: UUID, invoice: InvoiceUpdate, db: AsyncSession = Depends(get_session)):
+    updated_invoice = await crud_invoice.update_invoice(db=db, invoice_id=invoice_id, invoice_data=invoice)
     if not updated_invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    return updated_invoice
\ No newline at end of file
+    return updated_invoice
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from app.core.cache import response_cache
+from app.core.coalesce import single_flight
+from app.core.counts import count_service
+from app.core.database import replica_set
+from app.core.events import invoice_events
+from app.core.lifecycle import startup
+from app.core.pool import pool_stats
+from app.core.security import hashing_pool, token_service
+
+router = APIRouter()
+
+# Compteurs internes (démarrage, cache des réponses et des comptages, regroupement des lectures, pools de connexions, réplicas, flux d'événements, authentification).
+@router.get("/metrics", response_model=dict)
+async def get_metrics():
+    return {
+        "startup": startup,
+        "cache": response_cache.stats(),
+        "coalescing": single_flight.stats(),
+        "counts": count_service.stats(),
+        "pool": pool_stats(),
+        "replicas": replica_set.stats() if replica_set is not None else None,
+        "events": invoice_events.stats(),
+        "auth": {"hashing": hashing_pool.stats(), "tokens": token_service.stats()},
+    }
@@ -1,27 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.crud.revenue import update_revenue
-from app.models.revenue import Revenue as RevenueModel
-from app.schemas.revenue import RevenueUpdate, Revenue
-from app.core.database import get_db
+from app.crud.revenue_rollup import REVENUE_STATUSES
+from app.models.invoice import Invoice as InvoiceModel
+from app.models.revenue import Revenue as RevenueModel, RevenueDaily
+from app.schemas.revenue import RevenueUpdate, Revenue, RevenueSeries
+from app.core.cache import response_cache
+from app.core.conditional import conditional
+from app.core.config import settings
+from app.core.database import get_read_session, get_session
+from app.core.series import SeriesRange, series_payload, series_query
 
 router = APIRouter()
 
-@router.get("/revenue/", response_model=list[Revenue])
-def get_all_revenue(db: Session = Depends(get_db)):
-    return db.query(RevenueModel).order_by(RevenueModel.month).all()
+# Buckets mensuels maintenus depuis les factures : lecture en O(mois).
+@router.get("/revenue/", response_model=list[Revenue], dependencies=[conditional("revenue")])
+async def get_all_revenue(request: Request, db: AsyncSession = Depends(get_read_session)):
+    async def load():
+        result = await db.execute(select(RevenueModel.month, RevenueModel.revenue).order_by(RevenueModel.month))
+        return [revenue._asdict() for revenue in result.all()]
 
+    return await response_cache.get_or_load(request, ("revenue",), load)
 
-@router.get("/revenue/{month}", response_model=Revenue)
-def get_one_revenue(month: str, db: Session = Depends(get_db)):
-    revenue = db.query(RevenueModel).filter(RevenueModel.month == month).first()
+# Revenu par période (?from=&to=&granularity=day|week|month|quarter|year).
+# Lu dans revenue_daily (clé de type date) si REVENUE_DAILY_ROLLUP est actif,
+# sinon sommé sur les factures payées de l'intervalle (index sur invoices.date).
+@router.get("/revenue/series", response_model=RevenueSeries, dependencies=[conditional("revenue", "invoices")])
+async def get_revenue_series(request: Request, series: SeriesRange = Depends(), db: AsyncSession = Depends(get_read_session)):
+    async def load():
+        if settings.REVENUE_DAILY_ROLLUP:
+            query = series_query(RevenueDaily.day, [func.sum(RevenueDaily.revenue)], series)
+        else:
+            query = series_query(InvoiceModel.date, [func.sum(InvoiceModel.amount)], series).where(
+                InvoiceModel.status.in_(REVENUE_STATUSES)
+            )
+        return series_payload(series, (await db.execute(query)).all(), ("revenue",))
+
+    return await response_cache.get_or_load(request, ("revenue", "invoices"), load)
+
+@router.get("/revenue/{month}", response_model=Revenue, dependencies=[conditional("revenue")])
+async def get_one_revenue(month: str, db: AsyncSession = Depends(get_read_session)):
+    result = await db.execute(select(RevenueModel).where(RevenueModel.month == month))
+    revenue = result.scalars().first()
     if not revenue:
         raise HTTPException(status_code=404, detail="Revenue for the month not found")
     return revenue
 
+# Correction manuelle d'un mois : conservée par les incréments suivants,
+# écrasée par `python -m app.cli backfill-revenue`.
 @router.patch("/revenue/{month}", response_model=Revenue)
-def patch_revenue(month: str, revenue_data: RevenueUpdate, db: Session = Depends(get_db)):
-    updated_revenue = update_revenue(db=db, month=month, revenue_data=revenue_data)
+async def patch_revenue(month: str, revenue_data: RevenueUpdate, db: AsyncSession = Depends(get_session)):
+    updated_revenue = await update_revenue(db=db, month=month, revenue_data=revenue_data)
     if not updated_revenue:
         raise HTTPException(status_code=404, detail="Revenue for the month not found")
-    return updated_revenue
\ No newline at end of file
+    return updated_revenue
@@ -1,33 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from uuid import UUID
+from app.core import batch, serialization
+from app.core.conditional import conditional
+from app.core.database import get_read_session, get_session
 from app.models.user import User as UserModel
+from app.schemas.batch import BatchRequest, UserBatch
 from app.schemas.user import UserCreate, UserUpdate, User
 from app.crud import user as crud_user
 
 router = APIRouter()
 
-@router.get("/users/", response_model=list[User])
-def get_all_users(db: Session = Depends(get_db)):
-    return db.query(UserModel).all()
+# Colonnes des lignes de liste (jamais le mot de passe haché).
+USER_LIST_COLUMNS = {
+    "name": UserModel.name,
+    "email": UserModel.email,
+    "id": UserModel.id,
+}
 
-@router.get("/users/{user_id}", response_model=User)
-def get_one_user(user_id: str, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+# ?fields=id,name : seules ces colonnes sont sélectionnées et renvoyées.
+@router.get("/users/", response_model=list[User], dependencies=[conditional("users")])
+async def get_all_users(
+    response: Response,
+    db: AsyncSession = Depends(get_read_session),
+    fields: Optional[str] = Query(None, alias="fields")
+):
+    selected = serialization.parse_fields(fields, User)
+    # Ordre explicite : sans lui, l'ordre dépendrait du plan (index sur email si seul champ).
+    result = await db.execute(
+        select(*serialization.columns_for(selected, USER_LIST_COLUMNS)).order_by(UserModel.name, UserModel.id)
+    )
+    return serialization.render(
+        serialization.rows_to_items(selected, result.all()), response, serialization.sparse_adapter(User, selected)
+    )
+
+# Récupère plusieurs utilisateurs en une requête : ?ids=a,b,c (ou ids répété), dans l'ordre demandé.
+@router.get("/users/batch", response_model=UserBatch, dependencies=[conditional("users")])
+async def get_users_batch(ids: list[str] = Query(..., alias="ids"), db: AsyncSession = Depends(get_read_session)):
+    return await batch.fetch_batch(db, UserModel, batch.parse_ids(ids))
+
+@router.post("/users/batch", response_model=UserBatch)
+async def post_users_batch(body: BatchRequest, db: AsyncSession = Depends(get_read_session)):
+    return await batch.fetch_batch(db, UserModel, batch.unique_ids(body.ids))
+
+@router.get("/users/{user_id}", response_model=User, dependencies=[conditional("users")])
+async def get_one_user(user_id: UUID, db: AsyncSession = Depends(get_read_session)):
+    result = await db.execute(select(UserModel).where(UserModel.id == user_id))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @router.post("/users/", response_model=User)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user_by_email(db, email=user.email)
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_session)):
+    db_user = await crud_user.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud_user.create_user(db=db, user=user)
+    return await crud_user.create_user(db=db, user=user)
 
 @router.patch("/users/{user_id}", response_model=User)
-def update_user(user_id: str, user: UserUpdate, db: Session = Depends(get_db)):
-    updated_user = crud_user.update_user(db=db, user_id=user_id, user_data=user)
+async def update_user(user_id: UUID, user: UserUpdate, db: AsyncSession = Depends(get_session)):
+    updated_user = await crud_user.update_user(db=db, user_id=user_id, user_data=user)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
-    return updated_user
\ No newline at end of file
+    return updated_user
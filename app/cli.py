@@ -0,0 +1,76 @@
+import argparse
+import sys
+from app.core.database import engine
+from app import migrations
+from app.core.index_check import check_indexes
+from app.crud.customer_summary import rebuild_customer_summaries
+from app.crud.revenue_rollup import backfill_revenue
+from app.crud.table_version import bump_statement
+
+# Commandes d'administration : python -m app.cli <commande>
+
+def migrate(args):
+    if args.down is not None:
+        versions = migrations.downgrade(engine, args.down)
+        print(f"Reverted: {', '.join(versions) or 'nothing'}")
+    else:
+        versions = migrations.upgrade(engine, args.target)
+        print(f"Applied: {', '.join(versions) or 'nothing'}")
+
+def rebuild_summaries(args):
+    with engine.begin() as connection:
+        count = rebuild_customer_summaries(connection)
+        connection.execute(bump_statement("customer_summaries"))
+    print(f"Rebuilt {count} customer summaries")
+
+def backfill(args):
+    with engine.begin() as connection:
+        count = backfill_revenue(connection)
+        connection.execute(bump_statement("revenue"))
+    print(f"Rebuilt {count} revenue months")
+
+def check(args):
+    failures = 0
+    for name, scans, plan in check_indexes(engine):
+        if scans:
+            failures += 1
+            print(f"FAIL {name}: sequential scan on {', '.join(scans)}")
+        else:
+            print(f"ok   {name}")
+        if scans or args.verbose:
+            for line in plan:
+                print(f"       {line}")
+    if failures:
+        print(f"{failures} hot queries without index")
+        sys.exit(1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Applique les migrations de schéma.")
+    migrate_parser.add_argument("--target", help="Dernière version à appliquer.")
+    migrate_parser.add_argument("--down", metavar="VERSION", help="Revient à cette version (exclue).")
+    migrate_parser.set_defaults(handler=migrate)
+
+    summaries_parser = commands.add_parser(
+        "rebuild-summaries", help="Recalcule les agrégats par client depuis les factures."
+    )
+    summaries_parser.set_defaults(handler=rebuild_summaries)
+
+    revenue_parser = commands.add_parser(
+        "backfill-revenue", help="Recalcule les buckets de revenu depuis les factures."
+    )
+    revenue_parser.set_defaults(handler=backfill)
+
+    check_parser = commands.add_parser(
+        "check-indexes", help="EXPLAIN des requêtes chaudes ; échoue sur un parcours séquentiel."
+    )
+    check_parser.add_argument("--verbose", action="store_true", help="Affiche tous les plans.")
+    check_parser.set_defaults(handler=check)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
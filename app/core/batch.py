@@ -0,0 +1,45 @@
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import any_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.core.database import is_postgresql
+from app.schemas.batch import BATCH_MAX_IDS
+
+# Lecture groupée par identifiants (/customers/batch, /invoices/batch, /users/batch) :
+# une requête pour toute la liste au lieu d'un appel par identifiant.
+
+def parse_ids(values: list) -> list:
+    # `ids` répété ou séparé par des virgules ; doublons ignorés, ordre conservé.
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                ids.append(UUID(part))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid id: {part}")
+    return unique_ids(ids)
+
+def unique_ids(ids: list) -> list:
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="At least one id is required.")
+    if len(ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request.")
+    return ids
+
+def id_filter(column, ids: list):
+    # PostgreSQL : un seul paramètre tableau (= ANY), même texte SQL quel que soit le nombre d'ids.
+    if is_postgresql():
+        return column == any_(literal(ids, ARRAY(column.type)))
+    return column.in_(ids)
+
+async def fetch_batch(db, model, ids: list) -> dict:
+    rows = (await db.execute(select(model).where(id_filter(model.id, ids)))).scalars().all()
+    by_id = {row.id: row for row in rows}
+    return {
+        "items": [by_id[id] for id in ids if id in by_id],
+        "missing": [id for id in ids if id not in by_id],
+    }
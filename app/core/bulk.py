@@ -0,0 +1,84 @@
+import json
+from fastapi import HTTPException, Request
+from pydantic import TypeAdapter, ValidationError
+
+# Lecture et validation des corps d'import en masse (/invoices/bulk, /customers/bulk).
+# JSON : un tableau d'objets ; NDJSON (application/x-ndjson) : un objet par ligne,
+# lu en flux, la mémoire reste bornée par la taille d'un lot.
+
+BULK_CHUNK_SIZE = 1000
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in NDJSON_TYPES
+
+async def iter_ndjson(request: Request):
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def iter_rows(request: Request):
+    # Produit (index, objet ou None si la ligne n'est pas du JSON valide).
+    if is_ndjson(request):
+        index = 0
+        async for line in iter_ndjson(request):
+            try:
+                yield index, json.loads(line)
+            except ValueError:
+                yield index, None
+            index += 1
+        return
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON.")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON.")
+    for index, row in enumerate(rows):
+        yield index, row
+
+async def iter_chunks(request: Request, chunk_size: int = BULK_CHUNK_SIZE):
+    chunk = []
+    async for item in iter_rows(request):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def validate_chunk(schema, chunk: list):
+    # Validation du lot en un appel ; ligne par ligne seulement s'il contient des erreurs.
+    # Renvoie ([(index, modèle)], [résultat d'erreur]).
+    try:
+        models = TypeAdapter(list[schema]).validate_python([row for _, row in chunk])
+        return [(index, model) for (index, _), model in zip(chunk, models)], []
+    except ValidationError:
+        pass
+    valid, invalid = [], []
+    for index, row in chunk:
+        try:
+            valid.append((index, schema.model_validate(row)))
+        except ValidationError as e:
+            fields = ", ".join(".".join(str(part) for part in error["loc"]) or "row" for error in e.errors())
+            invalid.append(row_result(index, "invalid", detail=f"Invalid fields: {fields}"))
+    return valid, invalid
+
+def row_result(index: int, status: str, id=None, detail: str = None) -> dict:
+    return {"index": index, "status": status, "id": id, "detail": detail}
+
+def summarize(results: list) -> dict:
+    results.sort(key=lambda result: result["index"])
+    return {
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "duplicates": sum(1 for result in results if result["status"] == "duplicate"),
+        "invalid": sum(1 for result in results if result["status"] == "invalid"),
+        "results": results,
+    }
@@ -0,0 +1,164 @@
+import json
+import time
+from collections import OrderedDict
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from app.core.coalesce import single_flight
+from app.core.config import settings
+
+# Cache des réponses des endpoints de lecture du tableau de bord.
+#
+# Une entrée est indexée par route + paramètres de requête triés + génération de chaque
+# tag dont elle dépend ("invoices", "customers", "revenue"). Les écritures de app/crud
+# incrémentent la génération des tags touchés : les anciennes entrées ne sont plus lues
+# et finissent évincées (LRU/TTL). Une lecture lancée avant une écriture est rangée
+# sous l'ancienne génération, elle ne peut donc pas masquer l'invalidation.
+#
+# La clé porte aussi les versions des tables lues par la requête (table_versions, lues en
+# base par la dépendance conditional) : les générations du cache mémoire sont propres à
+# chaque worker, une écriture faite sur un autre worker change quand même la clé. Une
+# entrée n'est donc jamais servie sous un ETag plus récent que ses données.
+#
+# Un miss passe par single_flight (app/core/coalesce.py) : les requêtes identiques arrivées
+# pendant le chargement attendent son résultat au lieu de relancer la même requête SQL.
+# Cache désactivé (none) : regroupement seul, sur la route, les paramètres et les versions ;
+# un chargement lancé avant une écriture n'est jamais partagé avec une requête arrivée après.
+
+class MemoryCacheBackend:
+    # Processus unique : LRU borné + TTL.
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.evictions = 0
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.evictions += 1
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_generations(self, tags) -> list:
+        return [self.generations.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags):
+        for tag in tags:
+            self.generations[tag] = self.generations.get(tag, 0) + 1
+
+    def size(self) -> int:
+        return len(self.entries)
+
+class RedisCacheBackend:
+    # Partagé entre workers : TTL par clé, éviction LRU laissée à Redis (maxmemory-policy allkeys-lru).
+    def __init__(self, url: str, ttl: float, prefix: str = "cache:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package.") from e
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0
+
+    async def get(self, key: str):
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=max(int(self.ttl), 1))
+
+    async def get_generations(self, tags) -> list:
+        values = await self.client.mget([f"{self.prefix}gen:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, tags):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"{self.prefix}gen:{tag}")
+            await pipe.execute()
+
+    def size(self):
+        return None
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.routes = {}
+
+    @staticmethod
+    def request_key(request: Request) -> str:
+        params = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{params}"
+
+    @staticmethod
+    def versions_key(request: Request) -> str:
+        versions = getattr(request.state, "table_versions", {})
+        return "@" + ",".join(f"{table}.{version}" for table, version in sorted(versions.items()))
+
+    def count(self, route: str, field: str):
+        counters = self.routes.setdefault(route, {"hits": 0, "misses": 0})
+        counters[field] += 1
+        setattr(self, field, getattr(self, field) + 1)
+
+    async def get_or_load(self, request: Request, tags: tuple, loader):
+        # `loader` : coroutine sans argument renvoyant la réponse de l'endpoint.
+        if self.backend is None:
+            return await single_flight.do(self.request_key(request) + self.versions_key(request), loader, request.url.path)
+        generations = await self.backend.get_generations(tags)
+        key = self.request_key(request) + "#" + ",".join(
+            f"{tag}:{generation}" for tag, generation in zip(tags, generations)
+        ) + self.versions_key(request)
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.count(request.url.path, "hits")
+            return cached
+        self.count(request.url.path, "misses")
+        return await single_flight.do(key, lambda: self.load(key, loader), request.url.path)
+
+    async def load(self, key: str, loader):
+        value = jsonable_encoder(await loader())
+        await self.backend.set(key, value)
+        return value
+
+    async def invalidate(self, *tags: str):
+        if self.backend is None:
+            return
+        self.invalidations += 1
+        await self.backend.bump(tags)
+
+    def stats(self) -> dict:
+        return {
+            "backend": settings.CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "entries": self.backend.size() if self.backend is not None else 0,
+            "routes": self.routes,
+        }
+
+def create_backend():
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.CACHE_REDIS_URL, settings.CACHE_TTL_SECONDS)
+    return None
+
+response_cache = ResponseCache(create_backend())
@@ -0,0 +1,70 @@
+import asyncio
+from app.core.config import settings
+
+# Regroupement des lectures identiques simultanées (single-flight), devant le cache des réponses.
+#
+# Au rafraîchissement du tableau de bord, des centaines de clients envoient au même moment la
+# même requête (/invoices/status, /invoices/latest, /revenue/...). La première (leader) exécute
+# le chargement ; celles qui arrivent pendant son exécution attendent et reçoivent le même
+# résultat (ou la même exception) sans requête SQL. Rien n'est gardé après : la requête
+# suivante relance un chargement (le cache, s'il est actif, reste seul responsable de la durée
+# de vie). Si le leader est annulé (client parti), un des suivants reprend le chargement.
+
+class SingleFlight:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.calls = {}
+        self.leaders = 0
+        self.collapsed = 0
+        self.routes = {}
+
+    def count(self, route: str, field: str):
+        counters = self.routes.setdefault(route, {"leaders": 0, "collapsed": 0})
+        counters[field] += 1
+        setattr(self, field, getattr(self, field) + 1)
+
+    async def do(self, key: str, loader, route: str = ""):
+        # `loader` : coroutine sans argument ; `key` : route + paramètres normalisés.
+        if not self.enabled:
+            return await loader()
+        while True:
+            future = self.calls.get(key)
+            if future is None:
+                break
+            self.count(route, "collapsed")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Leader annulé : nouvel essai ; notre propre annulation est propagée.
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        self.count(route, "leaders")
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Exception marquée comme lue : pas d'avertissement s'il n'y a aucun suivant.
+            future.exception()
+            raise
+        finally:
+            if self.calls.get(key) is future:
+                del self.calls[key]
+        future.set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "in_flight": len(self.calls),
+            "routes": self.routes,
+        }
+
+single_flight = SingleFlight(settings.COALESCE_REQUESTS)
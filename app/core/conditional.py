@@ -0,0 +1,62 @@
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from app.core.database import get_read_session
+from app.models.table_version import TableVersion
+
+# GET conditionnels : ETag / Last-Modified dérivés des versions des tables lues
+# (table_versions, incrémentées par app/crud dans la transaction de chaque écriture).
+#
+# La dépendance lit les versions (une requête sur clé primaire) avant l'endpoint : si le
+# client a déjà la représentation (If-None-Match, ou If-Modified-Since), la réponse est un
+# 304 sans aucune requête sur les lignes. Les versions sont lues avant les données : une
+# écriture concurrente donne au pire un ETag ancien sur des données récentes, donc un
+# rechargement de trop au prochain appel, jamais une réponse périmée.
+
+def make_etag(tables: tuple, versions: dict) -> str:
+    return 'W/"' + "-".join(f"{table}.{versions.get(table, 0)}" for table in tables) + '"'
+
+def etag_matches(header: str, etag: str) -> bool:
+    # Comparaison faible : le préfixe W/ est ignoré.
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def not_modified_since(header: str, last_modified) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+def conditional(*tables: str):
+    # Usage : @router.get(..., dependencies=[conditional("invoices", "customers")])
+    async def check(request: Request, response: Response, db=Depends(get_read_session)):
+        rows = (await db.execute(
+            select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+            .where(TableVersion.table_name.in_(tables))
+        )).all()
+        versions = {row.table_name: row.version for row in rows}
+        # Réutilisées par le service de comptage (app/core/counts.py).
+        request.state.table_versions = {table: versions.get(table, 0) for table in tables}
+        headers = {"ETag": make_etag(tables, versions), "Cache-Control": "no-cache"}
+        last_modified = None
+        if rows:
+            # SQLite renvoie des dates naïves, enregistrées en UTC.
+            last_modified = max(
+                row.updated_at if row.updated_at.tzinfo else row.updated_at.replace(tzinfo=timezone.utc)
+                for row in rows
+            )
+            headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match, headers["ETag"])
+        else:
+            not_modified = bool(if_modified_since and last_modified and not_modified_since(if_modified_since, last_modified))
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(check)
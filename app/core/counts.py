@@ -0,0 +1,76 @@
+import time
+from collections import OrderedDict
+from sqlalchemy import select, text
+from app.core.config import settings
+from app.core.database import is_postgresql
+from app.models.table_version import TableVersion
+
+# Comptages de /invoices/count, /customers/count, /invoices/pages et /customers/pages.
+#
+# - Exact (défaut) : résultat gardé COUNT_CACHE_TTL_SECONDS, indexé par endpoint + `query`
+#   + versions des tables lues (table_versions, déjà lues par la dépendance conditional) :
+#   une écriture, sur n'importe quel worker, change la clé ; le cache ne sert jamais un
+#   total périmé, et un hit évite aussi la construction du filtre de recherche.
+# - approx=true sans `query` : estimation des statistiques du planificateur
+#   (pg_class.reltuples, mise à jour par ANALYZE / autovacuum), sans parcours.
+#   Hors PostgreSQL, ou table jamais analysée : comptage exact.
+
+ESTIMATE_QUERY = text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table_name)")
+
+class CountService:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.estimates = 0
+
+    async def estimate(self, db, table_name: str):
+        if not is_postgresql():
+            return None
+        reltuples = await db.scalar(ESTIMATE_QUERY, {"table_name": table_name})
+        # -1 (ou 0 avant tout ANALYZE) : pas de statistiques.
+        if reltuples is None or reltuples <= 0:
+            return None
+        self.estimates += 1
+        return int(reltuples)
+
+    async def versions(self, request, db, tables: tuple) -> tuple:
+        versions = getattr(request.state, "table_versions", {})
+        missing = [table for table in tables if table not in versions]
+        if missing:
+            rows = (await db.execute(
+                select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(missing))
+            )).all()
+            versions = {**versions, **{table: 0 for table in missing}, **{row.table_name: row.version for row in rows}}
+        return tuple(versions[table] for table in tables)
+
+    async def count(self, request, db, name: str, tables: tuple, query: str, build, approx: bool = False):
+        # `build(query)` : coroutine renvoyant la requête de comptage ; tables[0] est la table comptée.
+        # Renvoie (nombre, approché).
+        query = query.strip()
+        if approx and not query:
+            estimate = await self.estimate(db, tables[0])
+            if estimate is not None:
+                return estimate, True
+
+        key = (name, query) + await self.versions(request, db, tables)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], False
+
+        self.misses += 1
+        value = await db.scalar(await build(query))
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value, False
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "estimates": self.estimates, "entries": len(self.entries)}
+
+count_service = CountService(settings.COUNT_CACHE_TTL_SECONDS, settings.COUNT_CACHE_MAX_ENTRIES)
@@ -1,16 +1,223 @@
+from contextlib import asynccontextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from starlette.concurrency import run_in_threadpool
 from .config import settings  # Importer les paramètres de configuration
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument
+from .replicas import Replica, ReplicaSet
+
+# Pilotes asynchrones correspondant aux URLs synchrones.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))\
+        .render_as_string(hide_password=False)
+
+def statement_timeout_args(url) -> dict:
+    # statement_timeout fixé à l'ouverture de chaque connexion (PostgreSQL uniquement).
+    if not settings.DB_STATEMENT_TIMEOUT_MS or url.get_backend_name() != "postgresql":
+        return {}
+    timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": timeout}}
+    return {"options": f"-c statement_timeout={timeout}"}
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    url = make_url(url)
+    options = {"connect_args": statement_timeout_args(url)}
+    if url.get_backend_name() == "sqlite":
+        # SQLite : la connexion est utilisée depuis plusieurs threads du threadpool.
+        options["connect_args"]["check_same_thread"] = False
+        if url.database in (None, "", ":memory:"):
+            # Base en mémoire : pool par défaut (une connexion partagée), pas de réglages.
+            return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return options
+
+class RoutingSession(Session):
+    # Session d'une lecture seule (session_scope(read_only=True)) : les lectures vont au réplica
+    # choisi (info["replica"]). Dès qu'elle écrit (flush, INSERT/UPDATE/DELETE, FOR UPDATE),
+    # elle reste sur le primaire jusqu'à sa fermeture : les relectures voient ses écritures.
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        replica = self.info.get("replica")
+        if replica is not None:
+            if self._flushing or isinstance(clause, UpdateBase) or getattr(clause, "_for_update_arg", None) is not None:
+                self.info["replica"] = None
+            else:
+                replica.reads += 1
+                return replica.bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
 
 # Utiliser DATABASE_URL depuis les paramètres de configuration
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+instrument("sync", engine)
+# expire_on_commit=False : les objets renvoyés par les écritures (RETURNING) restent lisibles après le commit.
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 Base = declarative_base()
 
+# Moteur asynchrone (asyncpg), créé seulement si le chemin asynchrone est actif.
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True)
+) if settings.DB_ASYNC else None
+if async_engine is not None:
+    instrument("async", async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+) if settings.DB_ASYNC else None
+
+def create_replica(index: int, url: str) -> Replica:
+    # Même pilote (synchrone ou asynchrone) et mêmes réglages de pool que le primaire.
+    if settings.DB_ASYNC:
+        url = to_async_url(url)
+        replica_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        instrument(f"replica{index}", replica_engine.sync_engine)
+    else:
+        replica_engine = create_engine(url, **engine_options(url))
+        instrument(f"replica{index}", replica_engine)
+    return Replica(f"replica{index}", replica_engine)
+
+READ_DATABASE_URLS = [url.strip() for url in settings.READ_DATABASE_URL.split(",") if url.strip()]
+replica_set = ReplicaSet(
+    [create_replica(index, url) for index, url in enumerate(READ_DATABASE_URLS)],
+    settings.REPLICA_HEALTH_INTERVAL,
+) if READ_DATABASE_URLS else None
+
+def is_postgresql() -> bool:
+    return engine.dialect.name == "postgresql"
+
+def dialect_insert(model):
+    # INSERT propre au dialecte (ON CONFLICT disponible sur PostgreSQL et SQLite).
+    if is_postgresql():
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+class ThreadedStreamResult:
+    # Équivalent d'AsyncResult (AsyncSession.stream) : chaque lot est lu dans le threadpool.
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size=None):
+        partitions = self.result.partitions(size)
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                return
+            yield partition
+
+    async def close(self):
+        await run_in_threadpool(self.result.close)
+
+class ThreadedSession:
+    # Expose l'API d'AsyncSession au-dessus d'une Session bloquante :
+    # chaque aller-retour en base est exécuté dans le threadpool.
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    @property
+    def bind(self):
+        return self.sync_session.get_bind()
+
+    def get_bind(self, *args, **kwargs):
+        return self.sync_session.get_bind(*args, **kwargs)
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+        return ThreadedStreamResult(result)
+
+    async def flush(self, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.flush, *args, **kwargs)
+
+    async def refresh(self, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+@asynccontextmanager
+async def session_scope(read_only: bool = False):
+    # Session hors requête (commandes, tâches de fond), selon le chemin configuré.
+    # read_only=True : lectures sur un réplica sain s'il y en a (voir RoutingSession).
+    replica = await replica_set.pick() if read_only and replica_set is not None else None
+    if settings.DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            db.sync_session.info["replica"] = replica
+            yield db
+    else:
+        sync_session = SessionLocal()
+        sync_session.info["replica"] = replica
+        db = ThreadedSession(sync_session)
+        try:
+            yield db
+        finally:
+            await db.close()
+
+# Dépendance utilisée par les endpoints : AsyncSession (asyncpg) ou Session bloquante
+# dans le threadpool si DB_ASYNC=false, avec la même interface.
+async def get_session():
+    async with session_scope() as db:
+        yield db
+
+# Dépendance des endpoints GET : lectures sur un réplica (READ_DATABASE_URL), repli sur le primaire.
+async def get_read_session():
+    async with session_scope(read_only=True) as db:
+        yield db
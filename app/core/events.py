@@ -0,0 +1,215 @@
+import asyncio
+import itertools
+import json
+import logging
+from sqlalchemy.engine import make_url
+from starlette.responses import StreamingResponse
+from app.core.config import settings
+from app.core.database import is_postgresql
+from app.core.serialization import dumps
+
+# Flux d'événements poussés aux tableaux de bord (GET /invoices/stream, Server-Sent Events).
+#
+# - Broker : diffusion en processus ; chaque abonné a une file bornée (EVENTS_QUEUE_SIZE).
+#   Un abonné trop lent ne ralentit ni les écritures ni les autres abonnés : sa file est
+#   vidée et remplacée par un événement "resync" (le client recharge ses données).
+# - PostgresBroker : les écritures publient par NOTIFY, chaque worker écoute (LISTEN) sur une
+#   connexion asyncpg dédiée et diffuse à ses propres abonnés ; tous les workers voient toutes
+#   les écritures. Hors PostgreSQL (SQLite, tests), le Broker en processus suffit.
+
+logger = logging.getLogger("app.events")
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def put(self, event: dict) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Retard irrattrapable : les événements en attente sont remplacés par un resync.
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+            return False
+
+    async def next(self, timeout: float):
+        # Prochain événement, ou None après `timeout` secondes. asyncio.wait plutôt que
+        # wait_for : une annulation (client parti, arrêt) n'est jamais absorbée.
+        getter = asyncio.ensure_future(self.queue.get())
+        try:
+            done, _ = await asyncio.wait((getter,), timeout=timeout)
+        finally:
+            if not getter.done():
+                getter.cancel()
+        return getter.result() if done else None
+
+    def close(self):
+        # Arrêt du worker : les événements en attente cèdent la place à un "reconnect" final.
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait({"type": "reconnect"})
+
+class Broker:
+    def __init__(self, channel: str, queue_size: int, max_subscribers: int):
+        self.channel = channel
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers = set()
+        self.listeners = []
+        self.ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.draining = False
+
+    def subscribe(self):
+        # None si le worker s'arrête ou a déjà EVENTS_MAX_SUBSCRIBERS abonnés.
+        if self.draining or len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def add_listener(self, listener):
+        # listener(event) : appelé dans ce worker pour chaque événement reçu (ex. rafraîchissement différé).
+        self.listeners.append(listener)
+
+    def deliver(self, event: dict):
+        event = {"id": next(self.ids), **event}
+        for subscriber in list(self.subscribers):
+            if subscriber.put(event):
+                self.delivered += 1
+            else:
+                self.overflows += 1
+        for listener in self.listeners:
+            listener(event)
+
+    def drain(self):
+        # Signal d'arrêt reçu : chaque flux ouvert se termine (le client se reconnecte à un
+        # autre worker) au lieu de bloquer l'arrêt jusqu'à SERVER_GRACEFUL_TIMEOUT.
+        self.draining = True
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+
+    async def publish(self, event: dict):
+        # Appelé après le commit de l'écriture.
+        self.published += 1
+        self.deliver(event)
+
+    async def ensure_listening(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "subscribers": len(self.subscribers),
+            "draining": self.draining,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+class PostgresBroker(Broker):
+    def __init__(self, channel: str, dsn: str, queue_size: int, max_subscribers: int):
+        super().__init__(channel, queue_size, max_subscribers)
+        self.dsn = dsn
+        self.connection = None
+        self.connect_lock = asyncio.Lock()
+        self.send_lock = asyncio.Lock()
+        self.errors = 0
+
+    async def connect(self):
+        async with self.connect_lock:
+            if self.connection is None or self.connection.is_closed():
+                import asyncpg
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(self.channel, self.on_notify)
+                self.connection = connection
+            return self.connection
+
+    def on_notify(self, connection, pid, channel, payload):
+        self.deliver(json.loads(payload))
+
+    async def publish(self, event: dict):
+        # Une erreur de diffusion ne fait pas échouer l'écriture, déjà validée.
+        self.published += 1
+        try:
+            connection = await self.connect()
+            async with self.send_lock:
+                await connection.execute("SELECT pg_notify($1, $2)", self.channel, dumps(event).decode())
+        except Exception:
+            self.errors += 1
+            logger.exception("NOTIFY failed on %s", self.channel)
+
+    async def ensure_listening(self):
+        # Appelé par les flux ouverts : reconnexion (et nouveau LISTEN) après une coupure.
+        try:
+            await self.connect()
+        except Exception:
+            self.errors += 1
+            logger.exception("LISTEN failed on %s", self.channel)
+
+    async def close(self):
+        if self.connection is not None and not self.connection.is_closed():
+            await self.connection.close()
+        self.connection = None
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": "postgresql", "errors": self.errors}
+
+class Debounced:
+    # Exécute `action` au plus une fois par `delay` secondes, `delay` après le premier appel.
+    def __init__(self, delay: float, action):
+        self.delay = delay
+        self.action = action
+        self.task = None
+
+    def schedule(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        await asyncio.sleep(self.delay)
+        try:
+            await self.action()
+        except Exception:
+            logger.exception("debounced action failed")
+
+def sse_message(event: dict) -> bytes:
+    # Format Server-Sent Events : le type devient le nom de l'événement.
+    return f"id: {event.get('id', 0)}\nevent: {event['type']}\ndata: ".encode() + dumps(event) + b"\n\n"
+
+class EventStreamResponse(StreamingResponse):
+    # Réponse SSE d'un abonné : désabonné quand la réponse se termine, quelle qu'en soit l'issue.
+    # Le finally du générateur ne suffit pas : client parti avant le premier octet (générateur
+    # jamais démarré, et pas de tâche d'arrière-plan après ClientDisconnect), erreur d'envoi.
+    media_type = "text/event-stream"
+
+    def __init__(self, content, broker: Broker, subscriber: Subscriber):
+        super().__init__(content, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        self.broker = broker
+        self.subscriber = subscriber
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.broker.unsubscribe(self.subscriber)
+
+def create_broker(channel: str) -> Broker:
+    if is_postgresql():
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBroker(channel, dsn, settings.EVENTS_QUEUE_SIZE, settings.EVENTS_MAX_SUBSCRIBERS)
+    return Broker(channel, settings.EVENTS_QUEUE_SIZE, settings.EVENTS_MAX_SUBSCRIBERS)
+
+invoice_events = create_broker("invoice_events")
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+import zlib
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from app.core.database import session_scope
+
+# Export en flux (/invoices/export, /customers/export) : les lignes sont lues par lots
+# avec un curseur côté serveur (yield_per) et écrites au fil de l'eau, la mémoire reste
+# bornée par la taille d'un lot quel que soit le volume exporté.
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def accepts_gzip(request: Request) -> bool:
+    encodings = request.headers.get("accept-encoding", "").lower()
+    return any(encoding.split(";")[0].strip() == "gzip" for encoding in encodings.split(","))
+
+def csv_lines(columns: list, rows, with_header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if with_header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+def ndjson_lines(columns: list, rows) -> str:
+    # UUID et dates sérialisés via str() (format ISO, comme les endpoints de liste).
+    return "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+async def iter_export(statement, export_format: str):
+    # Session propre au flux (sur un réplica s'il y en a) : celle de la requête est fermée
+    # avant la fin de l'envoi.
+    columns = list(statement.selected_columns.keys())
+    async with session_scope(read_only=True) as db:
+        result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        first = True
+        async for rows in result.partitions():
+            if export_format == "csv":
+                yield csv_lines(columns, rows, first).encode()
+            else:
+                yield ndjson_lines(columns, rows).encode()
+            first = False
+        if first and export_format == "csv":
+            # Export vide : l'en-tête seul.
+            yield csv_lines(columns, [], True).encode()
+
+async def gzip_chunks(chunks):
+    # wbits=31 : en-tête et pied gzip, compression incrémentale lot par lot.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(request: Request, statement, export_format: str, name: str) -> StreamingResponse:
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}.{export_format}"',
+        "Vary": "Accept-Encoding",
+    }
+    body = iter_export(statement, export_format)
+    if accepts_gzip(request):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[export_format], headers=headers)
@@ -0,0 +1,104 @@
+import json
+import re
+from datetime import timedelta
+from sqlalchemy import func, select, tuple_
+from app.api.endpoints.customers import CustomerModel, customers_list_query
+from app.api.endpoints.invoices import InvoiceModel, invoices_list_query
+from app.core.series import SeriesRange, series_query
+
+# Vérification des index des chemins chauds (python -m app.cli check-indexes) :
+# EXPLAIN de la requête de chaque endpoint sur une base remplie (python -m benchmarks seed),
+# échec si une table censée être lue par index est parcourue séquentiellement.
+#
+# - PostgreSQL : EXPLAIN (FORMAT JSON), nœuds "Seq Scan" sur les tables vérifiées.
+# - SQLite : EXPLAIN QUERY PLAN, lignes "SCAN <table>" sans index.
+
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+def sample(connection):
+    # Valeurs réelles pour les paramètres (curseurs, identifiants).
+    invoice = connection.execute(select(InvoiceModel.id, InvoiceModel.date, InvoiceModel.customer_id).limit(1)).first()
+    customer = connection.execute(select(CustomerModel.id, CustomerModel.name).limit(1)).first()
+    if invoice is None or customer is None:
+        raise RuntimeError("Empty database: seed it first (python -m benchmarks seed).")
+    return invoice, customer
+
+# nom -> (tables lues par index, requête de l'endpoint).
+# /invoices/status n'y figure pas : la somme par statut lit toutes les factures, l'index
+# (status, amount) en fait au mieux un parcours d'index couvrant.
+def hot_queries(invoice, customer) -> dict:
+    invoices_page = invoices_list_query().order_by(InvoiceModel.date.desc(), InvoiceModel.id.desc())
+    customers_page = customers_list_query().order_by(CustomerModel.name.asc(), CustomerModel.id.asc())
+    month = SeriesRange(invoice.date - timedelta(days=30), invoice.date, "day")
+    return {
+        "GET /invoices": (("invoices", "customers"), invoices_page.limit(10)),
+        "GET /invoices?cursor": (("invoices", "customers"), invoices_page.where(
+            tuple_(InvoiceModel.date, InvoiceModel.id) < (invoice.date, invoice.id)
+        ).limit(11)),
+        "GET /invoices/latest": (("invoices", "customers"), invoices_list_query().order_by(InvoiceModel.date.desc()).limit(5)),
+        "invoices of a customer": (("invoices",), invoices_page.where(InvoiceModel.customer_id == invoice.customer_id).limit(10)),
+        "GET /invoices/series (30 days)": (("invoices",), series_query(
+            InvoiceModel.date, [func.count(), func.sum(InvoiceModel.amount)], month
+        )),
+        "GET /customers": (("customers", "customer_summaries"), customers_page.limit(10)),
+        "GET /customers?cursor": (("customers", "customer_summaries"), customers_page.where(
+            tuple_(CustomerModel.name, CustomerModel.id) > (customer.name, customer.id)
+        ).limit(11)),
+        "POST /customers (email lookup)": (("customers",), select(CustomerModel.id).where(CustomerModel.email == "check@example.com")),
+    }
+
+def explain(connection, statement) -> list:
+    # Paramètres rendus en littéraux : le plan est celui des valeurs échantillonnées.
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        return connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+    return [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+def plan_lines(plan) -> list:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    if not (plan and isinstance(plan[0], dict)):
+        return list(plan)
+    lines = []
+
+    def walk(node, depth):
+        relation = f" on {node['Relation Name']}" if "Relation Name" in node else ""
+        index = f" using {node['Index Name']}" if "Index Name" in node else ""
+        lines.append("  " * depth + node["Node Type"] + relation + index)
+        for child in node.get("Plans", ()):
+            walk(child, depth + 1)
+
+    walk(plan[0]["Plan"], 0)
+    return lines
+
+def sequential_scans(plan, tables) -> list:
+    # Tables de `tables` lues sans index.
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    if plan and isinstance(plan[0], dict):
+        scans = []
+
+        def walk(node):
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in tables:
+                scans.append(node["Relation Name"])
+            for child in node.get("Plans", ()):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return scans
+    scans = []
+    for detail in plan:
+        match = SQLITE_SCAN.match(detail)
+        if match and match.group(1) in tables and "INDEX" not in detail and "PRIMARY KEY" not in detail:
+            scans.append(match.group(1))
+    return scans
+
+def check_indexes(engine) -> list:
+    # [(nom, tables parcourues séquentiellement, lignes du plan)] pour chaque requête chaude.
+    results = []
+    with engine.connect() as connection:
+        invoice, customer = sample(connection)
+        for name, (tables, statement) in hot_queries(invoice, customer).items():
+            plan = explain(connection, statement)
+            results.append((name, sequential_scans(plan, tables), plan_lines(plan)))
+    return results
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import async_engine, engine, replica_set
+from app.core.events import invoice_events
+from app.core.security import hashing_pool
+
+# Démarrage et arrêt d'un worker (lifespan de l'application, voir app/server.py).
+#
+# Démarrage (WARMUP=true) : ouverture de DB_POOL_SIZE connexions par moteur (primaire et
+# réplicas), processus de hachage lancés, puis requêtes chaudes envoyées à l'application
+# elle-même : routes, validation, requêtes SQL compilées, index de recherche et caches sont
+# prêts avant la première vraie requête. Arrêt : dès le signal, les flux SSE se terminent ;
+# après la fin des requêtes en cours, fermeture des pools, de la connexion LISTEN et des
+# processus de hachage.
+
+# Journal d'uvicorn (niveau INFO configuré par uvicorn).
+logger = logging.getLogger("uvicorn.error")
+
+WARMUP_PATHS = (
+    "/invoices",
+    "/invoices/latest",
+    "/invoices/status",
+    "/invoices/count",
+    "/customers",
+    "/customers/count",
+    "/revenue/",
+)
+
+startup = {}
+
+def engines() -> list:
+    primary = async_engine if settings.DB_ASYNC else engine
+    return [primary] + ([replica.engine for replica in replica_set.replicas] if replica_set is not None else [])
+
+def open_connections_sync(sync_engine, count: int):
+    connections = [sync_engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
+
+async def open_connections(db_engine, count: int):
+    # Connexions ouvertes en même temps puis rendues au pool, qui les garde.
+    if isinstance(db_engine, AsyncEngine):
+        connections = await asyncio.gather(*(db_engine.connect().start() for _ in range(count)))
+        for connection in connections:
+            await connection.close()
+    else:
+        await run_in_threadpool(open_connections_sync, db_engine, count)
+
+async def request(app, path: str) -> int:
+    # Appel ASGI direct, sans passer par le réseau.
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"warmup")],
+        "client": ("127.0.0.1", 0),
+        "server": ("warmup", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+async def warm_up(app) -> dict:
+    for db_engine in engines():
+        await open_connections(db_engine, settings.DB_POOL_SIZE)
+    await hashing_pool.warm()
+    statuses = {}
+    for path in WARMUP_PATHS:
+        try:
+            statuses[path] = await request(app, path)
+        except Exception:
+            logger.exception("warmup request failed: %s", path)
+            statuses[path] = 500
+    return statuses
+
+def on_shutdown_signal(action):
+    # Chaîne `action` devant les gestionnaires SIGINT/SIGTERM d'uvicorn (installés avant le
+    # lifespan) : elle s'exécute dans la boucle dès le signal, avant l'attente des requêtes
+    # en cours. uvicorn restaure ses propres gestionnaires à la fin.
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(action)
+            previous(signum, frame)
+
+        signal.signal(sig, handler)
+
+async def close():
+    await invoice_events.close()
+    hashing_pool.shutdown()
+    for db_engine in engines():
+        if isinstance(db_engine, AsyncEngine):
+            await db_engine.dispose()
+        else:
+            db_engine.dispose()
+
+def create_lifespan(started_at: float):
+    # `started_at` : time.perf_counter() au début de l'import de l'application.
+    @asynccontextmanager
+    async def lifespan(app):
+        ready_at = time.perf_counter()
+        if not settings.AUTH_SECRET:
+            # Pas de repli silencieux : jetons valables sur ce seul processus, perdus au redémarrage.
+            logger.error(
+                "AUTH_SECRET is empty: tokens are signed with a random per-process key, "
+                "rejected by other workers and invalidated on restart. Set AUTH_SECRET in production."
+            )
+        statuses = await warm_up(app) if settings.WARMUP else {}
+        startup.update(
+            import_ms=round((ready_at - started_at) * 1000, 1),
+            warmup_ms=round((time.perf_counter() - ready_at) * 1000, 1),
+            total_ms=round((time.perf_counter() - started_at) * 1000, 1),
+            warmup=statuses,
+        )
+        logger.info(
+            "worker ready in %.1f ms (import %.1f ms, warmup %.1f ms)",
+            startup["total_ms"], startup["import_ms"], startup["warmup_ms"],
+        )
+        on_shutdown_signal(invoice_events.drain)
+        try:
+            yield
+        finally:
+            await close()
+
+    return lifespan
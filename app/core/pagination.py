@@ -0,0 +1,29 @@
+import base64
+import binascii
+import json
+from datetime import date
+from fastapi import HTTPException
+
+# Curseurs opaques pour la pagination par clé (keyset) :
+# les valeurs de la clé de tri de la dernière ligne, encodées en base64 url-safe.
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, date) else str(value) for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    # `types` convertit chaque valeur (ex. date.fromisoformat, UUID, str).
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+def get_total_pages(total_items: int, limit: int) -> int:
+    return (total_items + limit - 1) // limit
@@ -0,0 +1,109 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Instrumentation du pool de connexions, exposée sur GET /metrics (section "pool").
+#
+# - Attente au checkout : histogramme du temps passé dans `_do_get` (file d'attente
+#   quand toutes les connexions sont prises), et nombre de TimeoutError.
+# - Jauges (en cours d'utilisation, overflow, libres) : lues sur le pool au moment de l'appel.
+# - Compteurs checkout/checkin/connect : événements de pool SQLAlchemy.
+
+# Bornes supérieures des buckets, en millisecondes.
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class PoolMetrics:
+    def __init__(self):
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_count = 0
+        self.wait_sum_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+
+    def observe_wait(self, wait_ms: float):
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound), len(WAIT_BUCKETS_MS))
+        self.buckets[index] += 1
+        self.wait_count += 1
+        self.wait_sum_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def histogram(self) -> dict:
+        # Cumulatif (comme les histogrammes Prometheus) : nombre d'attentes <= borne.
+        histogram, total = {}, 0
+        for bound, count in zip((*map(str, WAIT_BUCKETS_MS), "+Inf"), self.buckets):
+            total += count
+            histogram[bound] = total
+        return histogram
+
+    def stats(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "count": self.wait_count,
+                "sum": round(self.wait_sum_ms, 3),
+                "max": round(self.wait_max_ms, 3),
+                "buckets": self.histogram(),
+            },
+        }
+
+class InstrumentedPoolMixin:
+    # `_do_get` est l'attente d'une connexion libre (aucun événement public ne la couvre).
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.observe_wait((time.perf_counter() - start) * 1000)
+
+    def recreate(self):
+        # engine.dispose() recrée le pool : les métriques (et les événements) sont conservés.
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    metrics = None
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = None
+
+# Métriques par moteur ("sync", "async"), enregistrées par instrument().
+pool_metrics = {}
+
+def instrument(name: str, engine):
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPoolMixin):
+        return
+    metrics = PoolMetrics()
+    pool.metrics = metrics
+    pool_metrics[name] = (metrics, engine)
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+def pool_stats() -> dict:
+    return {name: metrics.stats(engine.pool) for name, (metrics, engine) in pool_metrics.items()}
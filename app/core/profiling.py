@@ -0,0 +1,109 @@
+import logging
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from app.core.config import settings
+
+# Profilage SQL par requête HTTP (PROFILING=true).
+#
+# Les hooks before/after_cursor_execute des moteurs de app/core/database.py mesurent chaque
+# instruction ; le middleware rattache les mesures à la requête en cours (ContextVar) et les
+# renvoie dans l'en-tête Server-Timing :
+#
+#     Server-Timing: db;dur=12.4;desc="7 queries", db-slowest;dur=5.1
+#
+# Les instructions plus lentes que SLOW_QUERY_MS sont journalisées (logger "app.sql") avec
+# leur route, et leur plan si SLOW_QUERY_EXPLAIN=true.
+# Désactivé, rien n'est enregistré : aucun coût sur le chemin des requêtes.
+
+logger = logging.getLogger("app.sql")
+
+class RequestProfile:
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries", db-slowest;dur={self.slowest_ms:.1f}'
+
+current_profile = ContextVar("current_profile", default=None)
+
+def explain(conn, cursor, statement: str, parameters):
+    # Plan sur la même connexion (SELECT seulement : EXPLAIN sans ANALYZE n'exécute rien).
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        explain_cursor = conn.connection.cursor()
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            return "\n".join(" ".join(str(value) for value in row) for row in explain_cursor.fetchall())
+        finally:
+            explain_cursor.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed_ms)
+    if elapsed_ms < settings.SLOW_QUERY_MS:
+        return
+    route = profile.route if profile is not None else "-"
+    logger.warning("slow query (%.1f ms) on %s: %s", elapsed_ms, route, statement)
+    if settings.SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip().upper().startswith("SELECT"):
+        logger.warning("plan for slow query on %s:\n%s", route, explain(conn, cursor, statement, parameters))
+
+def install_hooks(engine):
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+class ProfilingMiddleware:
+    # Middleware ASGI pur : pas de copie du corps de la réponse (compatible avec les flux).
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(f"{scope['method']} {scope['path']}")
+        token = current_profile.set(profile)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                # Route résolue par le routeur (gabarit, ex. /invoices/{invoice_id}).
+                route = scope.get("route")
+                if route is not None:
+                    profile.route = f"{scope['method']} {route.path}"
+                message["headers"] = [
+                    *message.get("headers", []), (b"server-timing", profile.server_timing().encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+
+def setup_profiling(app, *engines):
+    # `engines` : moteurs synchrones ou asynchrones (hooks posés sur leur sync_engine).
+    if not settings.PROFILING:
+        return
+    for engine in engines:
+        if engine is not None:
+            install_hooks(getattr(engine, "sync_engine", engine))
+    app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,91 @@
+import itertools
+import time
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+# Réplicas en lecture (READ_DATABASE_URL), utilisés par les sessions en lecture seule.
+#
+# Vérification de santé paresseuse : un réplica est testé (SELECT 1) au plus une fois par
+# REPLICA_HEALTH_INTERVAL secondes, au moment où une session le choisit. Un réplica en échec,
+# ou dont une connexion est coupée pendant une requête, est écarté jusqu'à la vérification
+# suivante ; sans réplica sain, les lectures repassent sur le primaire.
+
+class Replica:
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = None
+        self.checks = 0
+        self.failures = 0
+        self.reads = 0
+
+        @event.listens_for(self.bind, "handle_error")
+        def on_error(context):
+            if context.is_disconnect:
+                self.mark_down()
+
+    @property
+    def bind(self):
+        # Moteur synchrone utilisé par Session.get_bind (sync_engine pour un moteur asynchrone).
+        return self.engine.sync_engine if isinstance(self.engine, AsyncEngine) else self.engine
+
+    def mark_down(self):
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+    def ping_sync(self):
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    async def ping(self):
+        if isinstance(self.engine, AsyncEngine):
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        else:
+            await run_in_threadpool(self.ping_sync)
+
+    async def check(self, interval: float):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < interval:
+            return self.healthy
+        self.checks += 1
+        try:
+            await self.ping()
+            self.healthy = True
+        except Exception:
+            self.failures += 1
+            self.healthy = False
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+class ReplicaSet:
+    def __init__(self, replicas: list, interval: float):
+        self.replicas = replicas
+        self.interval = interval
+        self.cycle = itertools.cycle(replicas)
+        self.fallbacks = 0
+
+    async def pick(self):
+        # Tourniquet sur les réplicas sains ; None : lecture sur le primaire.
+        for _ in range(len(self.replicas)):
+            replica = next(self.cycle)
+            if await replica.check(self.interval):
+                return replica
+        self.fallbacks += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "fallbacks": self.fallbacks,
+            "replicas": {
+                replica.name: {
+                    "healthy": replica.healthy,
+                    "checks": replica.checks,
+                    "failures": replica.failures,
+                    "reads": replica.reads,
+                }
+                for replica in self.replicas
+            },
+        }
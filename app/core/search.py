@@ -0,0 +1,202 @@
+import asyncio
+import re
+from sqlalchemy import false, or_, select, true
+from app.core.database import is_postgresql
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.table_version import TableVersion
+
+# Sous-système de recherche : construit les prédicats du paramètre `query`.
+#
+# - PostgreSQL : ILIKE '%...%' servi par les index GIN pg_trgm
+#   (migration 0001_search_trigram).
+# - Autres bases (SQLite, tests) : index n-grammes en mémoire du processus,
+#   traduit en `id IN (...)`, rechargé quand table_versions change.
+# - Requêtes numériques : égalité ou intervalle sur `amount` (plus de cast en texte).
+
+NGRAM_SIZE = 3
+# Au-delà, la liste d'identifiants coûte plus cher qu'un parcours : on repasse sur LIKE.
+MAX_IN_IDS = 500
+
+AMOUNT_EXACT = re.compile(r"^\d+$")
+AMOUNT_RANGE = re.compile(r"^(\d+)\s*(?:-|\.\.)\s*(\d+)$")
+
+def use_trigram() -> bool:
+    return is_postgresql()
+
+def like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def ilike(column, query: str):
+    return column.ilike(like_pattern(query), escape="\\")
+
+def amount_filter(query: str):
+    # "1500" : montant exact ; "1000-2000" ou "1000..2000" : intervalle inclusif.
+    if AMOUNT_EXACT.match(query):
+        return Invoice.amount == int(query)
+    match = AMOUNT_RANGE.match(query)
+    if match:
+        low, high = sorted((int(match.group(1)), int(match.group(2))))
+        return Invoice.amount.between(low, high)
+    return None
+
+class NgramIndex:
+    # Index inversé n-gramme -> clés, avec vérification finale de la sous-chaîne.
+    def __init__(self, size: int = NGRAM_SIZE):
+        self.size = size
+        self.documents = {}
+        self.postings = {}
+
+    def grams(self, text: str) -> set:
+        return {text[i:i + self.size] for i in range(len(text) - self.size + 1)}
+
+    def add(self, key, *fields):
+        self.remove(key)
+        values = tuple(field.lower() for field in fields if field)
+        self.documents[key] = values
+        for value in values:
+            for gram in self.grams(value):
+                self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        for value in self.documents.pop(key, ()):
+            for gram in self.grams(value):
+                keys = self.postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[gram]
+
+    def search(self, query: str) -> set:
+        query = query.lower()
+        grams = self.grams(query)
+        if grams:
+            candidates = set.intersection(*(self.postings.get(gram, set()) for gram in grams))
+        else:
+            # Requête plus courte qu'un n-gramme : vérification sur tous les documents.
+            candidates = self.documents.keys()
+        return {
+            key for key in candidates
+            if any(query in value for value in self.documents[key])
+        }
+
+class SearchIndex:
+    # Index en mémoire utilisé hors PostgreSQL : clients (nom, email) et statuts des factures,
+    # pris aux versions de `customers` et `invoices` dans table_versions. Chaque recherche lit
+    # ces versions (une requête sur clé primaire) et recharge la partie dont la version a changé :
+    # les écritures d'un autre worker, de app.cli ou de `benchmarks seed` sont donc vues.
+    # Une écriture de ce processus qui suit directement la version de l'index y est appliquée
+    # sans rechargement.
+    TABLES = ("customers", "invoices")
+
+    def __init__(self):
+        self.customers = NgramIndex()
+        self.statuses = NgramIndex()
+        self.versions = {}
+        self.reloads = 0
+        self.lock = asyncio.Lock()
+
+    def reset(self):
+        self.__init__()
+
+    async def read_versions(self, db) -> dict:
+        rows = (await db.execute(
+            select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(self.TABLES))
+        )).all()
+        versions = dict(rows)
+        return {table: versions.get(table, 0) for table in self.TABLES}
+
+    def stale(self, versions: dict) -> list:
+        return [table for table in self.TABLES if self.versions.get(table) != versions[table]]
+
+    async def ensure_loaded(self, db):
+        if not self.stale(await self.read_versions(db)):
+            return
+        async with self.lock:
+            # Versions relues sous le verrou (une autre recherche a pu recharger entre-temps),
+            # avant les lignes : au pire un rechargement de trop, jamais un index périmé.
+            versions = await self.read_versions(db)
+            stale = self.stale(versions)
+            if "customers" in stale:
+                customers = NgramIndex()
+                for customer in (await db.execute(select(Customer.id, Customer.name, Customer.email))).all():
+                    customers.add(customer.id, customer.name, customer.email)
+                self.customers = customers
+            if "invoices" in stale:
+                statuses = NgramIndex()
+                for status in (await db.execute(select(Invoice.status).distinct())).scalars():
+                    statuses.add(status, status)
+                self.statuses = statuses
+            self.versions.update({table: versions[table] for table in stale})
+            self.reloads += bool(stale)
+
+    def apply(self, table: str, versions: dict, change):
+        # `versions` : versions après l'écriture (bump_table_versions). Sinon (écriture d'un
+        # autre processus intercalée, index pas encore chargé) : rechargement à la recherche suivante.
+        version = versions.get(table)
+        if version is not None and self.versions.get(table) == version - 1:
+            change()
+            self.versions[table] = version
+
+search_index = SearchIndex()
+
+# Hooks appelés par app/crud après chaque écriture validée, avec les versions renvoyées par
+# bump_table_versions.
+def index_customers(customers, versions: dict):
+    if use_trigram():
+        return
+
+    def change():
+        for customer in customers:
+            search_index.customers.add(customer.id, customer.name, customer.email)
+
+    search_index.apply("customers", versions, change)
+
+def index_statuses(statuses, versions: dict):
+    if use_trigram():
+        return
+
+    def change():
+        for status in statuses:
+            search_index.statuses.add(status, status)
+
+    search_index.apply("invoices", versions, change)
+
+async def matching_customer_ids(db, query: str):
+    await search_index.ensure_loaded(db)
+    return search_index.customers.search(query)
+
+async def customer_text_filter(db, query: str, column=Customer.id):
+    # Nom ou email contenant `query` ; `column` porte l'identifiant du client.
+    if not use_trigram():
+        ids = await matching_customer_ids(db, query)
+        if len(ids) <= MAX_IN_IDS:
+            return column.in_(ids) if ids else false()
+    return ilike(Customer.name, query) | ilike(Customer.email, query)
+
+async def status_filter(db, query: str):
+    if not use_trigram():
+        await search_index.ensure_loaded(db)
+        statuses = search_index.statuses.search(query)
+        return Invoice.status.in_(statuses) if statuses else false()
+    return ilike(Invoice.status, query)
+
+async def customer_filter(db, query: str):
+    query = query.strip()
+    if not query:
+        return true()
+    return await customer_text_filter(db, query)
+
+async def invoice_filter(db, query: str, with_customer: bool = True):
+    # `with_customer` : la requête joint `customers` et cherche aussi nom/email.
+    query = query.strip()
+    if not query:
+        return true()
+    predicates = [await status_filter(db, query)]
+    if with_customer:
+        predicates.insert(0, await customer_text_filter(db, query, column=Invoice.customer_id))
+    amount = amount_filter(query)
+    if amount is not None:
+        predicates.append(amount)
+    return or_(*predicates)
@@ -0,0 +1,203 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.core.config import settings
+
+# Mots de passe et jetons d'accès.
+#
+# - Hachage scrypt (hashlib, sans dépendance) : "scrypt$n$r$p$sel$empreinte" en base64.
+#   Chaque calcul coûte des dizaines de ms de CPU : il est exécuté dans un pool de
+#   processus borné (HASH_WORKERS), jamais dans la boucle d'événements. Au-delà de
+#   HASH_MAX_PENDING calculs en cours ou en attente, ou après HASH_TIMEOUT_SECONDS,
+#   la requête reçoit un 503 au lieu d'allonger la file.
+# - Jetons "charge.signature" signés HMAC-SHA256 : vérifiés sans base ni hachage, avec un
+#   cache des jetons déjà validés.
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+HASH_PREFIX = "scrypt$"
+TOKEN_CACHE_SIZE = 10_000
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=128 * n * r * 2, dklen=32)
+
+# Fonctions exécutées dans les processus du pool.
+def hash_password_sync(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    digest = scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"{HASH_PREFIX}{SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${b64encode(salt)}${b64encode(digest)}"
+
+def verify_password_sync(password: str, encoded: str) -> bool:
+    if not encoded.startswith(HASH_PREFIX):
+        # Mot de passe historique en clair (rehaché au prochain login réussi).
+        return hmac.compare_digest(password.encode(), encoded.encode())
+    _, n, r, p, salt, digest = encoded.split("$")
+    return hmac.compare_digest(scrypt(password, b64decode(salt), int(n), int(r), int(p)), b64decode(digest))
+
+def pool_ready() -> bool:
+    return True
+
+def needs_rehash(encoded: str) -> bool:
+    return not encoded.startswith(f"{HASH_PREFIX}{SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+class HashingPool:
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.broken = 0
+
+    def get_executor(self):
+        # Créé au premier usage : pas de processus pour les commandes ou les benchmarks.
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+
+    async def warm(self):
+        # Démarre tous les processus (lifespan) : le premier login ne paie pas leur lancement.
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, pool_ready) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def discard(self, executor):
+        # Processus de hachage mort (OOM...) : le pool est inutilisable, il est remplacé au
+        # calcul suivant (une seule fois si plusieurs requêtes le constatent).
+        if self.executor is executor:
+            self.broken += 1
+            self.executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def release(self):
+        self.pending -= 1
+        self.completed += 1
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Authentication is busy, retry later.", headers={"Retry-After": "1"})
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Pas de calcul lancé, donc pas de release à venir.
+            self.pending -= 1
+            self.discard(executor)
+            raise HTTPException(status_code=503, detail="Authentication is unavailable, retry later.", headers={"Retry-After": "1"})
+        # À la fin réelle du calcul (même après un timeout) : la file reflète le travail en cours.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPException(status_code=503, detail="Authentication timed out, retry later.", headers={"Retry-After": "1"})
+        except BrokenProcessPool:
+            self.discard(executor)
+            raise HTTPException(status_code=503, detail="Authentication is unavailable, retry later.", headers={"Retry-After": "1"})
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "broken": self.broken,
+        }
+
+hashing_pool = HashingPool(settings.HASH_WORKERS, settings.HASH_MAX_PENDING, settings.HASH_TIMEOUT_SECONDS)
+
+# Empreinte de référence : un email inconnu coûte le même calcul qu'un mot de passe faux.
+DUMMY_HASH = f"{HASH_PREFIX}{SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${b64encode(bytes(16))}${b64encode(bytes(32))}"
+
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run(hash_password_sync, password)
+
+async def verify_password(password: str, encoded: str) -> bool:
+    return await hashing_pool.run(verify_password_sync, password, encoded or DUMMY_HASH)
+
+class TokenService:
+    def __init__(self, secret: str, ttl: int):
+        # Secret vide : clé aléatoire propre au processus (développement), signalée au démarrage
+        # du worker (app/core/lifecycle.py).
+        self.secret = (secret or secrets.token_hex(32)).encode()
+        self.ttl = ttl
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def sign(self, payload: str) -> str:
+        return b64encode(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, user_id) -> tuple:
+        expires_at = int(time.time()) + self.ttl
+        payload = b64encode(json.dumps({"sub": str(user_id), "exp": expires_at}).encode())
+        return f"{payload}.{self.sign(payload)}", expires_at
+
+    def verify(self, token: str):
+        # Renvoie (user_id, expires_at) ou None.
+        claims = self.cache.get(token)
+        if claims is not None:
+            self.hits += 1
+            self.cache.move_to_end(token)
+        else:
+            self.misses += 1
+            payload, _, signature = token.partition(".")
+            if not hmac.compare_digest(signature, self.sign(payload)):
+                return None
+            try:
+                data = json.loads(b64decode(payload))
+                claims = (data["sub"], int(data["exp"]))
+            except (ValueError, KeyError, TypeError):
+                return None
+            self.cache[token] = claims
+            while len(self.cache) > TOKEN_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        if claims[1] < time.time():
+            self.cache.pop(token, None)
+            return None
+        return claims
+
+    def stats(self) -> dict:
+        return {"cached": len(self.cache), "hits": self.hits, "misses": self.misses}
+
+token_service = TokenService(settings.AUTH_SECRET, settings.AUTH_TOKEN_TTL_SECONDS)
+
+bearer = HTTPBearer(auto_error=False)
+
+# Dépendance des routes authentifiées : renvoie (user_id, expires_at) du jeton Bearer.
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer)):
+    claims = token_service.verify(credentials.credentials) if credentials else None
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token.", headers={"WWW-Authenticate": "Bearer"})
+    return claims
@@ -0,0 +1,88 @@
+import json
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter, create_model
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Sérialisation rapide des listes (FAST_SERIALIZATION=true).
+#
+# Les endpoints sélectionnent des colonnes dans l'ordre des champs du schéma Pydantic de la
+# réponse (columns_for) ; chaque ligne devient un dict par zip puis la liste est encodée en
+# une fois en JSON, sans revalidation par response_model. Le résultat est identique, octet
+# pour octet, à la sortie de FastAPI : JSON compact, UTF-8 non échappé, UUID et dates ISO.
+#
+# Champs partiels (?fields=id,amount) : seules les colonnes demandées sont sélectionnées
+# (et les jointures inutiles évitées par l'endpoint) ; la réponse suit le schéma réduit.
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    # Repli sans orjson : mêmes options que la JSONResponse de Starlette.
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
+
+@lru_cache(maxsize=None)
+def schema_fields(schema) -> tuple:
+    # Ordre de sérialisation des champs (champs hérités d'abord).
+    return tuple(schema.model_fields)
+
+def parse_fields(fields: Optional[str], schema) -> tuple:
+    # Champs demandés, dans l'ordre du schéma ; tous si `fields` est absent ou vide.
+    allowed = schema_fields(schema)
+    requested = {field.strip() for field in (fields or "").split(",") if field.strip()}
+    if not requested:
+        return allowed
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}.",
+        )
+    return tuple(field for field in allowed if field in requested)
+
+@lru_cache(maxsize=None)
+def sparse_adapter(schema, fields: tuple):
+    # Validation d'une liste de lignes réduites aux champs `fields` ; None si tous les champs.
+    if fields == schema_fields(schema):
+        return None
+    model = create_model(
+        f"{schema.__name__}Fields",
+        **{field: (schema.model_fields[field].annotation, ...) for field in fields},
+    )
+    return TypeAdapter(list[model])
+
+def columns_for(fields, columns: dict) -> list:
+    # `fields` : schéma Pydantic ou tuple de noms ; `columns` : nom -> expression SQL.
+    if not isinstance(fields, tuple):
+        fields = schema_fields(fields)
+    return [columns[field].label(field) for field in fields]
+
+def rows_to_items(fields, rows) -> list:
+    # Colonnes supplémentaires en fin de ligne (ex. total_items) ignorées par zip.
+    if not isinstance(fields, tuple):
+        fields = schema_fields(fields)
+    return [dict(zip(fields, row)) for row in rows]
+
+def render(content, response: Response = None, sparse=None):
+    # Réponse JSON déjà encodée, ou le contenu tel quel (validé par FastAPI) si désactivé.
+    # `sparse` (sparse_adapter) : champs partiels, que le response_model complet de la route
+    # rejetterait ; sur le chemin standard, les lignes sont validées par le schéma réduit.
+    if not settings.FAST_SERIALIZATION:
+        if sparse is None:
+            return content
+        if isinstance(content, dict):
+            content = {**content, "items": sparse.dump_python(sparse.validate_python(content["items"]), mode="json")}
+        else:
+            content = sparse.dump_python(sparse.validate_python(content), mode="json")
+    json_response = Response(content=dumps(content), media_type="application/json")
+    if response is not None:
+        # En-têtes posés sur le paramètre `response` (X-Total-Count, X-Next-Cursor...).
+        json_response.headers.raw.extend(response.headers.raw)
+    return json_response
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+from fastapi import HTTPException, Query
+from sqlalchemy import Date, DateTime, Integer, cast, func, literal_column, select
+from app.core.database import is_postgresql
+
+# Séries temporelles (/revenue/series, /invoices/series) : regroupement par période fait par
+# la base sur une colonne de type date (date_trunc sur PostgreSQL, date() sur SQLite), filtre
+# [from, to] servi par l'index sur la date. Réponse en tableaux parallèles (buckets, valeurs),
+# périodes sans données comprises (0) : le client trace directement.
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+# ~10 ans jour par jour.
+SERIES_MAX_BUCKETS = 3700
+
+def bucket(column, granularity: str):
+    # Début de la période contenant `column` (semaines ISO : lundi).
+    if is_postgresql():
+        # Unité (une de GRANULARITIES) en littéral : avec un paramètre lié, PostgreSQL ne
+        # reconnaît pas l'expression du SELECT comme celle du GROUP BY.
+        return cast(func.date_trunc(literal_column(f"'{granularity}'"), cast(column, DateTime)), Date)
+    if granularity == "day":
+        return func.date(column, type_=Date)
+    if granularity == "week":
+        return func.date(column, "weekday 0", "-6 days", type_=Date)
+    if granularity == "month":
+        return func.date(column, "start of month", type_=Date)
+    if granularity == "quarter":
+        months_back = (cast(func.strftime("%m", column), Integer) - 1) % 3
+        return func.date(column, "start of month", func.printf("-%d months", months_back), type_=Date)
+    return func.date(column, "start of year", type_=Date)
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return day.replace(month=day.month - (day.month - 1) % 3, day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    months = {"month": 1, "quarter": 3, "year": 12}[granularity]
+    month = start.month - 1 + months
+    return start.replace(year=start.year + month // 12, month=month % 12 + 1)
+
+def bucket_range(date_from: date, date_to: date, granularity: str) -> list:
+    buckets = []
+    start = bucket_start(date_from, granularity)
+    while start <= date_to:
+        buckets.append(start)
+        if len(buckets) > SERIES_MAX_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many buckets (max {SERIES_MAX_BUCKETS}): use a coarser granularity or a shorter range.",
+            )
+        start = next_bucket(start, granularity)
+    return buckets
+
+class SeriesRange:
+    # Paramètres communs : ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclus)&granularity=month.
+    def __init__(
+        self,
+        date_from: date = Query(..., alias="from"),
+        date_to: date = Query(..., alias="to"),
+        granularity: str = Query("month", pattern="^(day|week|month|quarter|year)$"),
+    ):
+        if date_from > date_to:
+            raise HTTPException(status_code=400, detail="'from' must be before 'to'.")
+        self.date_from = date_from
+        self.date_to = date_to
+        self.granularity = granularity
+        self.buckets = bucket_range(date_from, date_to, granularity)
+
+def series_query(date_column, values: list, series: SeriesRange):
+    # SELECT période, valeurs... WHERE date BETWEEN from AND to GROUP BY période.
+    period = bucket(date_column, series.granularity).label("bucket")
+    return (
+        select(period, *values)
+        .where(date_column.between(series.date_from, series.date_to))
+        .group_by(period)
+        .order_by(period)
+    )
+
+def series_payload(series: SeriesRange, rows, names: tuple) -> dict:
+    # Lignes (période, v1, v2...) -> {"buckets": [...], names[0]: [...], ...}, 0 pour une période vide.
+    by_bucket = {row[0]: row[1:] for row in rows}
+    empty = (0,) * len(names)
+    values = [by_bucket.get(start, empty) for start in series.buckets]
+    payload = {"granularity": series.granularity, "buckets": [start.isoformat() for start in series.buckets]}
+    for index, name in enumerate(names):
+        payload[name] = [int(value[index] or 0) for value in values]
+    return payload
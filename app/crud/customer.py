@@ -1,33 +1,83 @@
-from sqlalchemy.orm import Session
+from uuid import UUID, uuid4
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import search
+from app.core.bulk import row_result
+from app.core.cache import response_cache
+from app.core.database import dialect_insert
+from app.crud.table_version import bump_table_versions
 from app.models.customer import Customer
 from app.schemas.customer import CustomerCreate, CustomerUpdate
 
-def create_customer(db: Session, customer: CustomerCreate):
-    # Vérifier si l'email existe déjà.
-    existing_customer = db.query(Customer).filter(Customer.email == customer.email).first()
-    if existing_customer:
+async def create_customer(db: AsyncSession, customer: CustomerCreate):
+    # Créer le client en une instruction : l'email déjà présent est détecté
+    # par ON CONFLICT (aucune ligne renvoyée) au lieu d'un SELECT préalable.
+    stmt = dialect_insert(Customer)\
+        .values(
+            name=customer.name, 
+            email=customer.email, 
+            image_url=customer.image_url
+        )\
+        .on_conflict_do_nothing(index_elements=[Customer.email])\
+        .returning(Customer)
+    db_customer = (await db.execute(stmt)).scalars().first()
+    if not db_customer:
+        await db.rollback()
         raise ValueError("Email already exists.")
 
-    # Créer le client.
-    db_customer = Customer(
-        name=customer.name, 
-        email=customer.email, 
-        image_url=customer.image_url
-    )
-    db.add(db_customer)
-    db.commit()
-    db.refresh(db_customer)
+    versions = await bump_table_versions(db, "customers")
+    await db.commit()
+    search.index_customers([db_customer], versions)
+    await response_cache.invalidate("customers")
     return db_customer
 
-def update_customer(db: Session, customer_id: str, customer_data: CustomerUpdate):
-    db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
+async def update_customer(db: AsyncSession, customer_id: UUID, customer_data: CustomerUpdate):
+    update_data = customer_data.model_dump(exclude_unset=True)
+    if not update_data:
+        result = await db.execute(select(Customer).where(Customer.id == customer_id))
+        return result.scalars().first()
+
+    # UPDATE ... RETURNING : une ligne absente donne un résultat vide.
+    result = await db.execute(
+        update(Customer).where(Customer.id == customer_id).values(**update_data).returning(Customer),
+        execution_options={"synchronize_session": False},
+    )
+    db_customer = result.scalars().first()
     if not db_customer:
         return None
 
-    update_data = customer_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_customer, key, value)
-
-    db.commit()
-    db.refresh(db_customer)
+    versions = await bump_table_versions(db, "customers")
+    await db.commit()
+    search.index_customers([db_customer], versions)
+    await response_cache.invalidate("customers")
     return db_customer
+
+async def bulk_create_customers(db: AsyncSession, customers: list):
+    # Un lot validé [(index, CustomerCreate)] : INSERT multi-lignes, les emails déjà
+    # présents sont écartés par ON CONFLICT (index unique ux_customers_email).
+    results, rows, emails = [], [], set()
+    for index, customer in customers:
+        if customer.email in emails:
+            results.append(row_result(index, "duplicate", detail="Email already exists."))
+            continue
+        emails.add(customer.email)
+        rows.append((index, {"id": uuid4(), **customer.model_dump()}))
+
+    if not rows:
+        return results
+    stmt = dialect_insert(Customer)\
+        .on_conflict_do_nothing(index_elements=[Customer.email])\
+        .returning(Customer.email)
+    inserted = set((await db.execute(stmt, [row for _, row in rows])).scalars())
+    versions = await bump_table_versions(db, "customers") if inserted else {}
+    await db.commit()
+    search.index_customers([Customer(**row) for _, row in rows if row["email"] in inserted], versions)
+
+    for index, row in rows:
+        if row["email"] in inserted:
+            results.append(row_result(index, "created", id=row["id"]))
+        else:
+            results.append(row_result(index, "duplicate", detail="Email already exists."))
+    if inserted:
+        await response_cache.invalidate("customers")
+    return results
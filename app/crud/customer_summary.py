@@ -0,0 +1,51 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import dialect_insert
+from app.models.customer import Customer
+from app.models.customer_summary import CustomerSummary
+from app.models.invoice import Invoice
+
+# Deltas par client : {customer_id: [total_invoices, total_pending, total_paid]}.
+def add_invoice_delta(deltas: dict, customer_id, amount: int, status: str, sign: int = 1):
+    delta = deltas.setdefault(customer_id, [0, 0, 0])
+    delta[0] += sign
+    if status == "pending":
+        delta[1] += sign * amount
+    elif status == "paid":
+        delta[2] += sign * amount
+
+async def apply_invoice_deltas(db: AsyncSession, deltas: dict):
+    # Un seul upsert pour tous les clients touchés, dans la transaction de l'écriture.
+    rows = [
+        {"customer_id": customer_id, "total_invoices": count, "total_pending": pending, "total_paid": paid}
+        for customer_id, (count, pending, paid) in deltas.items()
+        if count or pending or paid
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(CustomerSummary).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CustomerSummary.customer_id],
+        set_={
+            "total_invoices": CustomerSummary.total_invoices + stmt.excluded.total_invoices,
+            "total_pending": CustomerSummary.total_pending + stmt.excluded.total_pending,
+            "total_paid": CustomerSummary.total_paid + stmt.excluded.total_paid,
+        },
+    )
+    await db.execute(stmt)
+
+def rebuild_customer_summaries(connection) -> int:
+    # Reconstruction complète depuis les factures (connexion synchrone, dans une transaction).
+    summaries = select(
+        Customer.id,
+        func.count(Invoice.id),
+        func.coalesce(func.sum(Invoice.amount).filter(Invoice.status == "pending"), 0),
+        func.coalesce(func.sum(Invoice.amount).filter(Invoice.status == "paid"), 0),
+    ).outerjoin(Invoice, Invoice.customer_id == Customer.id)\
+     .group_by(Customer.id)
+
+    connection.execute(delete(CustomerSummary))
+    result = connection.execute(insert(CustomerSummary).from_select(
+        ["customer_id", "total_invoices", "total_pending", "total_paid"], summaries
+    ))
+    return result.rowcount
@@ -1,29 +1,159 @@
-from sqlalchemy.orm import Session
+from uuid import UUID, uuid4
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import search
+from app.core.bulk import row_result
+from app.core.cache import response_cache
+from app.core.database import is_postgresql
+from app.core.events import invoice_events
+from app.core.serialization import schema_fields
+from app.crud import customer_summary, revenue_rollup
+from app.crud.table_version import INVOICE_TABLES, bump_table_versions
+from app.models.customer import Customer
 from app.models.invoice import Invoice
-from app.schemas.invoice import InvoiceCreate, InvoiceUpdate
-
-def create_invoice(db: Session, invoice: InvoiceCreate):
-    # Créer une nouvelle facture
-    db_invoice = Invoice(
-        customer_id=invoice.customer_id,
-        amount=invoice.amount,
-        status=invoice.status,
-        date=invoice.date
+from app.schemas.invoice import Invoice as InvoiceSchema, InvoiceCreate, InvoiceUpdate
+
+# Contribution d'une facture aux données dérivées (agrégats clients, revenu) ;
+# sign=-1 retire l'ancienne version d'une facture modifiée.
+def add_invoice_deltas(deltas: dict, invoice, sign: int = 1):
+    customer_summary.add_invoice_delta(
+        deltas.setdefault("customers", {}), invoice.customer_id, invoice.amount, invoice.status, sign
     )
-    db.add(db_invoice)
-    db.commit()
-    db.refresh(db_invoice)
-    return db_invoice
+    revenue_rollup.add_invoice_delta(
+        deltas.setdefault("revenue", {}), invoice.date, invoice.amount, invoice.status, sign
+    )
+
+async def apply_invoice_deltas(db: AsyncSession, deltas: dict):
+    # Dans la transaction de l'écriture, avant le commit.
+    await customer_summary.apply_invoice_deltas(db, deltas.get("customers", {}))
+    await revenue_rollup.apply_revenue_deltas(db, deltas.get("revenue", {}))
 
-def update_invoice(db: Session, invoice_id: str, invoice_data: InvoiceUpdate):
-    db_invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-    if not db_invoice:
-        return None
+# Sommes des factures payées et en attente, en un seul parcours (/invoices/status, flux).
+async def status_totals(db: AsyncSession) -> dict:
+    amounts = (await db.execute(
+        select(
+            func.sum(Invoice.amount).filter(Invoice.status == 'paid').label("paid"),
+            func.sum(Invoice.amount).filter(Invoice.status == 'pending').label("pending"),
+        )
+    )).one()
+    return {"paid": amounts.paid or 0, "pending": amounts.pending or 0}
 
+# Événement du flux /invoices/stream, publié après le commit.
+async def publish_invoice_event(event_type: str, invoice):
+    await invoice_events.publish({
+        "type": event_type,
+        "invoice": {field: getattr(invoice, field) for field in schema_fields(InvoiceSchema)},
+    })
+
+async def create_invoice(db: AsyncSession, invoice: InvoiceCreate):
+    # Créer une nouvelle facture (INSERT ... RETURNING, sans relecture).
+    stmt = insert(Invoice)\
+        .values(
+            customer_id=invoice.customer_id,
+            amount=invoice.amount,
+            status=invoice.status,
+            date=invoice.date
+        )\
+        .returning(Invoice)
+    db_invoice = (await db.execute(stmt)).scalars().one()
+
+    deltas = {}
+    add_invoice_deltas(deltas, invoice)
+    await apply_invoice_deltas(db, deltas)
+    versions = await bump_table_versions(db, *INVOICE_TABLES)
+
+    await db.commit()
+    search.index_statuses({db_invoice.status}, versions)
+    await response_cache.invalidate("invoices", "revenue")
+    await publish_invoice_event("invoice.created", db_invoice)
+    return db_invoice
+
+async def update_invoice(db: AsyncSession, invoice_id: UUID, invoice_data: InvoiceUpdate):
     update_data = invoice_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_invoice, key, value)
+    if not update_data:
+        result = await db.execute(select(Invoice).where(Invoice.id == invoice_id))
+        return result.scalars().first()
+
+    if is_postgresql():
+        # Une seule instruction : UPDATE ... FROM un instantané verrouillé de la ligne,
+        # RETURNING renvoie la nouvelle version et les anciennes valeurs (pour les deltas).
+        previous_table = Invoice.__table__.alias("invoices_previous")
+        previous = select(previous_table)\
+            .where(previous_table.c.id == invoice_id)\
+            .with_for_update()\
+            .subquery("previous")
+        stmt = update(Invoice)\
+            .where(Invoice.id == previous.c.id)\
+            .values(**update_data)\
+            .returning(
+                Invoice,
+                previous.c.customer_id.label("previous_customer_id"),
+                previous.c.amount.label("previous_amount"),
+                previous.c.status.label("previous_status"),
+                previous.c.date.label("previous_date"),
+            )
+        row = (await db.execute(stmt, execution_options={"synchronize_session": False})).first()
+        if not row:
+            return None
+        db_invoice = row.Invoice
+        previous_invoice = Invoice(
+            customer_id=row.previous_customer_id,
+            amount=row.previous_amount,
+            status=row.previous_status,
+            date=row.previous_date,
+        )
+    else:
+        # SQLite : RETURNING ne peut pas lire une table du FROM, l'ancienne ligne est lue avant.
+        result = await db.execute(select(Invoice).where(Invoice.id == invoice_id).with_for_update())
+        previous_invoice = result.scalars().first()
+        if not previous_invoice:
+            return None
+        previous_invoice = Invoice(
+            customer_id=previous_invoice.customer_id,
+            amount=previous_invoice.amount,
+            status=previous_invoice.status,
+            date=previous_invoice.date,
+        )
+        result = await db.execute(
+            update(Invoice).where(Invoice.id == invoice_id).values(**update_data).returning(Invoice),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        db_invoice = result.scalars().one()
+
+    deltas = {}
+    add_invoice_deltas(deltas, previous_invoice, sign=-1)
+    add_invoice_deltas(deltas, db_invoice)
+    await apply_invoice_deltas(db, deltas)
+    versions = await bump_table_versions(db, *INVOICE_TABLES)
+
+    await db.commit()
+    search.index_statuses({db_invoice.status}, versions)
+    await response_cache.invalidate("invoices", "revenue")
+    await publish_invoice_event("invoice.updated", db_invoice)
+    return db_invoice
+
+async def bulk_create_invoices(db: AsyncSession, invoices: list):
+    # Un lot validé [(index, InvoiceCreate)] : INSERT multi-lignes et agrégats en une transaction.
+    customer_ids = {invoice.customer_id for _, invoice in invoices}
+    existing = set((await db.execute(select(Customer.id).where(Customer.id.in_(customer_ids)))).scalars())
+
+    results, rows, deltas = [], [], {}
+    for index, invoice in invoices:
+        if invoice.customer_id not in existing:
+            results.append(row_result(index, "invalid", detail="Unknown customer_id."))
+            continue
+        invoice_id = uuid4()
+        rows.append({"id": invoice_id, **invoice.model_dump()})
+        add_invoice_deltas(deltas, invoice)
+        results.append(row_result(index, "created", id=invoice_id))
 
-    db.commit()
-    db.refresh(db_invoice)
-    return db_invoice
\ No newline at end of file
+    if rows:
+        await db.execute(insert(Invoice), rows)
+        await apply_invoice_deltas(db, deltas)
+        versions = await bump_table_versions(db, *INVOICE_TABLES)
+        await db.commit()
+        search.index_statuses({row["status"] for row in rows}, versions)
+        await response_cache.invalidate("invoices", "revenue")
+        # Un seul événement par lot (la charge utile d'un NOTIFY est limitée à 8000 octets).
+        await invoice_events.publish({"type": "invoices.created", "count": len(rows)})
+    return results
@@ -1,16 +1,26 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import response_cache
+from app.crud.table_version import bump_table_versions
 from app.models.revenue import Revenue
 from app.schemas.revenue import RevenueUpdate
 
-def update_revenue(db: Session, month: str, revenue_data: RevenueUpdate):
-    db_revenue = db.query(Revenue).filter(Revenue.month == month).first()
+async def update_revenue(db: AsyncSession, month: str, revenue_data: RevenueUpdate):
+    update_data = revenue_data.model_dump(exclude_unset=True)
+    if not update_data:
+        result = await db.execute(select(Revenue).where(Revenue.month == month))
+        return result.scalars().first()
+
+    # UPDATE ... RETURNING : un mois absent donne un résultat vide.
+    result = await db.execute(
+        update(Revenue).where(Revenue.month == month).values(**update_data).returning(Revenue),
+        execution_options={"synchronize_session": False},
+    )
+    db_revenue = result.scalars().first()
     if not db_revenue:
         return None
 
-    update_data = revenue_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_revenue, key, value)
-
-    db.commit()
-    db.refresh(db_revenue)
-    return db_revenue
\ No newline at end of file
+    await bump_table_versions(db, "revenue")
+    await db.commit()
+    await response_cache.invalidate("revenue")
+    return db_revenue
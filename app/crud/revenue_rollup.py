@@ -0,0 +1,61 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models.invoice import Invoice
+from app.models.revenue import Revenue, RevenueDaily
+
+# Le revenu d'une période est la somme des factures payées de cette période.
+REVENUE_STATUSES = ("paid",)
+
+BACKFILL_BATCH_SIZE = 10000
+
+def month_key(day) -> str:
+    return day.strftime("%Y-%m")
+
+# Deltas : {("month", "YYYY-MM"): montant, ("day", date): montant}.
+def add_invoice_delta(deltas: dict, day, amount: int, status: str, sign: int = 1):
+    if status not in REVENUE_STATUSES:
+        return
+    month = ("month", month_key(day))
+    deltas[month] = deltas.get(month, 0) + sign * amount
+    if settings.REVENUE_DAILY_ROLLUP:
+        deltas[("day", day)] = deltas.get(("day", day), 0) + sign * amount
+
+def upsert_increment(model, key_column, rows):
+    stmt = dialect_insert(model).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[key_column],
+        set_={"revenue": model.revenue + stmt.excluded.revenue},
+    )
+
+async def apply_revenue_deltas(db: AsyncSession, deltas: dict):
+    # Incréments appliqués dans la transaction de l'écriture de facture.
+    months = [{"month": key, "revenue": amount} for (kind, key), amount in deltas.items() if kind == "month" and amount]
+    days = [{"day": key, "revenue": amount} for (kind, key), amount in deltas.items() if kind == "day" and amount]
+    if months:
+        await db.execute(upsert_increment(Revenue, Revenue.month, months))
+    if days:
+        await db.execute(upsert_increment(RevenueDaily, RevenueDaily.day, days))
+
+def backfill_revenue(connection) -> int:
+    # Reconstruction en un seul passage en flux sur les factures (connexion synchrone).
+    # Remplace le contenu de `revenue` (y compris les valeurs corrigées à la main).
+    months, days = {}, {}
+    invoices = connection.execute(
+        select(Invoice.date, Invoice.amount)
+        .where(Invoice.status.in_(REVENUE_STATUSES))
+        .execution_options(yield_per=BACKFILL_BATCH_SIZE)
+    )
+    for day, amount in invoices:
+        months[month_key(day)] = months.get(month_key(day), 0) + amount
+        if settings.REVENUE_DAILY_ROLLUP:
+            days[day] = days.get(day, 0) + amount
+
+    connection.execute(delete(Revenue))
+    if months:
+        connection.execute(insert(Revenue), [{"month": key, "revenue": amount} for key, amount in months.items()])
+    connection.execute(delete(RevenueDaily))
+    if days:
+        connection.execute(insert(RevenueDaily), [{"day": key, "revenue": amount} for key, amount in days.items()])
+    return len(months)
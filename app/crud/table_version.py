@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import dialect_insert
+from app.models.table_version import TableVersion
+
+# Tables suivies : une écriture incrémente la version de chaque table dont le contenu lu
+# par les GET change (les factures modifient aussi les agrégats clients et le revenu).
+INVOICE_TABLES = ("customer_summaries", "invoices", "revenue")
+
+def bump_statement(*tables: str):
+    # Ordre fixe des lignes verrouillées : pas d'interblocage entre écritures concurrentes.
+    now = datetime.now(timezone.utc)
+    stmt = dialect_insert(TableVersion).values([
+        {"table_name": table, "version": 1, "updated_at": now} for table in sorted(set(tables))
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[TableVersion.table_name],
+        set_={"version": TableVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+
+async def bump_table_versions(db: AsyncSession, *tables: str) -> dict:
+    # Dans la transaction de l'écriture, juste avant le commit. Renvoie les nouvelles versions.
+    result = await db.execute(bump_statement(*tables).returning(TableVersion.table_name, TableVersion.version))
+    return dict(result.all())
@@ -1,30 +1,66 @@
-from sqlalchemy.orm import Session
+from uuid import UUID
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import hash_password, needs_rehash, verify_password
+from app.crud.table_version import bump_table_versions
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
-def create_user(db: Session, user: UserCreate):
-    db_user = User(
-        name=user.name, 
-        email=user.email, 
-        password=user.password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+async def create_user(db: AsyncSession, user: UserCreate):
+    # Fin de la transaction ouverte par la vérification de l'email (get_user_by_email) : la
+    # connexion est rendue au pool pendant le hachage (pool de processus), puis INSERT ... RETURNING.
+    await db.commit()
+    password_hash = await hash_password(user.password)
+    stmt = insert(User)\
+        .values(
+            name=user.name, 
+            email=user.email, 
+            password=password_hash
+        )\
+        .returning(User)
+    db_user = (await db.execute(stmt)).scalars().one()
+    await bump_table_versions(db, "users")
+    await db.commit()
     return db_user
 
-def update_user(db: Session, user_id: str, user_data: UserUpdate):
-    db_user = db.query(User).filter(User.id == user_id).first()
+async def update_user(db: AsyncSession, user_id: UUID, user_data: UserUpdate):
+    update_data = user_data.model_dump(exclude_unset=True)
+    if not update_data:
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+    if "password" in update_data:
+        update_data["password"] = await hash_password(update_data["password"])
+
+    # UPDATE ... RETURNING : une ligne absente donne un résultat vide.
+    result = await db.execute(
+        update(User).where(User.id == user_id).values(**update_data).returning(User),
+        execution_options={"synchronize_session": False},
+    )
+    db_user = result.scalars().first()
     if not db_user:
         return None
 
-    update_data = user_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
-
-    db.commit()
-    db.refresh(db_user)
+    await bump_table_versions(db, "users")
+    await db.commit()
     return db_user
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
\ No newline at end of file
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    # Renvoie l'utilisateur si le mot de passe correspond, sinon None.
+    db_user = await get_user_by_email(db, email)
+    # Connexion rendue au pool pendant la vérification (expire_on_commit=False : db_user reste lisible).
+    await db.commit()
+    # Email inconnu : même coût de vérification (pas de détection des comptes par le temps de réponse).
+    valid = await verify_password(password, db_user.password if db_user else None)
+    if not db_user or not valid:
+        return None
+
+    if needs_rehash(db_user.password):
+        # Mot de passe en clair ou paramètres scrypt anciens : rehaché de façon transparente.
+        password_hash = await hash_password(password)
+        await db.execute(update(User).where(User.id == db_user.id).values(password=password_hash))
+        await db.commit()
+    return db_user
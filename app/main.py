@@ -1,18 +1,33 @@
+import time
+started_at = time.perf_counter()  # Durée de démarrage rapportée par le lifespan (imports compris).
+
 from fastapi import FastAPI
 from app.core.exception_handlers import custom_validation_exception_handler
 from fastapi.exceptions import RequestValidationError
-from app.api.endpoints import users, invoices, customers, revenue
+from app.api.endpoints import auth, users, invoices, customers, revenue, metrics
+from app.core.database import async_engine, engine, replica_set
+from app.core.lifecycle import create_lifespan
+from app.core.profiling import setup_profiling
 
-app = FastAPI()
+# Lifespan : préchauffage des pools et des requêtes chaudes, fermeture propre à l'arrêt.
+app = FastAPI(lifespan=create_lifespan(started_at))
 
 # Enregistre le gestionnaire d’exception global pour RequestValidationError
 app.add_exception_handler(RequestValidationError, custom_validation_exception_handler)
 
+# Profilage SQL (PROFILING=true) : en-tête Server-Timing et journal des requêtes lentes,
+# sur le primaire et les réplicas (lectures des GET).
+setup_profiling(
+    app, engine, async_engine, *([replica.engine for replica in replica_set.replicas] if replica_set is not None else [])
+)
+
 # Inclusion des routes
+app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(invoices.router)
 app.include_router(customers.router)
 app.include_router(revenue.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def read_root():
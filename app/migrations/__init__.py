@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+from app.migrations import (
+    m0001_search_trigram,
+    m0002_customer_summaries,
+    m0003_revenue_daily,
+    m0004_customers_email_unique,
+    m0005_table_versions,
+    m0006_hot_path_indexes,
+    m0007_revenue_bigint,
+    m0008_customers_email_single_unique,
+)
+
+# Migrations appliquées dans l'ordre de la liste ; chaque module expose
+# VERSION, DESCRIPTION, upgrade(connection) et downgrade(connection).
+MIGRATIONS = [
+    m0001_search_trigram,
+    m0002_customer_summaries,
+    m0003_revenue_daily,
+    m0004_customers_email_unique,
+    m0005_table_versions,
+    m0006_hot_path_indexes,
+    m0007_revenue_bigint,
+    m0008_customers_email_single_unique,
+]
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", String, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+def applied_versions(connection) -> set:
+    metadata.create_all(connection)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+def upgrade(engine, target: str = None) -> list:
+    # Applique les migrations manquantes jusqu'à `target` (incluse), une transaction chacune.
+    applied = []
+    for migration in MIGRATIONS:
+        # Vérifié avant tout : une cible déjà appliquée arrête aussi la montée.
+        if target is not None and migration.VERSION > target:
+            break
+        with engine.begin() as connection:
+            if migration.VERSION in applied_versions(connection):
+                continue
+            migration.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=migration.VERSION,
+                description=migration.DESCRIPTION,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        applied.append(migration.VERSION)
+    return applied
+
+def downgrade(engine, target: str) -> list:
+    # Annule les migrations appliquées postérieures à `target` (exclue).
+    reverted = []
+    for migration in reversed(MIGRATIONS):
+        if migration.VERSION <= target:
+            break
+        with engine.begin() as connection:
+            if migration.VERSION not in applied_versions(connection):
+                continue
+            migration.downgrade(connection)
+            connection.execute(
+                schema_migrations.delete().where(schema_migrations.c.version == migration.VERSION)
+            )
+        reverted.append(migration.VERSION)
+    return reverted
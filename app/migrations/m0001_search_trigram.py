@@ -0,0 +1,27 @@
+# Index de recherche : trigrammes (pg_trgm) pour les ILIKE '%...%' du paramètre `query`,
+# B-tree sur le montant pour les recherches numériques exactes ou par intervalle.
+VERSION = "0001"
+DESCRIPTION = "search trigram indexes"
+
+TRIGRAM_INDEXES = {
+    "ix_customers_name_trgm": ("customers", "name"),
+    "ix_customers_email_trgm": ("customers", "email"),
+    "ix_invoices_status_trgm": ("invoices", "status"),
+}
+
+def upgrade(connection):
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_invoices_amount ON invoices (amount)")
+    if connection.dialect.name != "postgresql":
+        # Hors PostgreSQL, la recherche textuelle passe par l'index n-grammes en mémoire.
+        return
+    connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, (table, column) in TRIGRAM_INDEXES.items():
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+
+def downgrade(connection):
+    if connection.dialect.name == "postgresql":
+        for name in TRIGRAM_INDEXES:
+            connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_invoices_amount")
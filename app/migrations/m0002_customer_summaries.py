@@ -0,0 +1,13 @@
+from app.crud.customer_summary import rebuild_customer_summaries
+from app.models.customer_summary import CustomerSummary
+
+# Table d'agrégats par client lue par /customers, remplie depuis les factures existantes.
+VERSION = "0002"
+DESCRIPTION = "customer summaries"
+
+def upgrade(connection):
+    CustomerSummary.__table__.create(connection, checkfirst=True)
+    rebuild_customer_summaries(connection)
+
+def downgrade(connection):
+    CustomerSummary.__table__.drop(connection, checkfirst=True)
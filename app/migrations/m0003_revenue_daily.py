@@ -0,0 +1,12 @@
+from app.models.revenue import RevenueDaily
+
+# Buckets de revenu journaliers (optionnels, REVENUE_DAILY_ROLLUP).
+# Le contenu de `revenue` est recalculé par `python -m app.cli backfill-revenue`.
+VERSION = "0003"
+DESCRIPTION = "revenue daily rollup"
+
+def upgrade(connection):
+    RevenueDaily.__table__.create(connection, checkfirst=True)
+
+def downgrade(connection):
+    RevenueDaily.__table__.drop(connection, checkfirst=True)
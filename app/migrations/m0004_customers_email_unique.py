@@ -0,0 +1,10 @@
+# Unicité des emails clients, cible du ON CONFLICT de /customers/bulk.
+# Échoue si des doublons existent déjà : les fusionner avant d'appliquer.
+VERSION = "0004"
+DESCRIPTION = "customers email unique"
+
+def upgrade(connection):
+    connection.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ux_customers_email ON customers (email)")
+
+def downgrade(connection):
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ux_customers_email")
@@ -0,0 +1,13 @@
+from app.crud.table_version import bump_statement
+from app.models.table_version import TableVersion
+
+# Versions par table pour les GET conditionnels (ETag / If-None-Match).
+VERSION = "0005"
+DESCRIPTION = "table versions"
+
+def upgrade(connection):
+    TableVersion.__table__.create(connection, checkfirst=True)
+    connection.execute(bump_statement("customer_summaries", "customers", "invoices", "revenue", "users"))
+
+def downgrade(connection):
+    TableVersion.__table__.drop(connection, checkfirst=True)
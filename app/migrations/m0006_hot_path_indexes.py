@@ -0,0 +1,26 @@
+# Index des chemins chauds (voir `python -m app.cli check-indexes`) :
+# - invoices (customer_id, date, id) : jointure clients -> factures, factures d'un client triées ;
+# - invoices (date, id) : tri et curseur de /invoices, /invoices/latest (parcours inverse) ;
+# - invoices (status, amount) : filtre par statut et sommes de /invoices/status sans lire la table ;
+# - customers (name, id) : tri et curseur de /customers.
+# L'unicité de customers.email est posée par la migration 0004.
+VERSION = "0006"
+DESCRIPTION = "hot path indexes"
+
+INDEXES = {
+    "ix_invoices_customer_date": ("invoices", "customer_id, date, id"),
+    "ix_invoices_date_id": ("invoices", "date, id"),
+    "ix_invoices_status_amount": ("invoices", "status, amount"),
+    "ix_customers_name_id": ("customers", "name, id"),
+}
+
+def upgrade(connection):
+    for name, (table, columns) in INDEXES.items():
+        connection.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    # Statistiques à jour pour que le planificateur tienne compte des nouveaux index.
+    for table in sorted({table for table, _ in INDEXES.values()}):
+        connection.exec_driver_sql(f"ANALYZE {table}")
+
+def downgrade(connection):
+    for name in INDEXES:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
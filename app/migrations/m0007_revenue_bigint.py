@@ -0,0 +1,12 @@
+# Buckets mensuels en bigint, comme revenue_daily et customer_summaries : la somme d'un mois
+# de factures dépasse int4 (~2,1e9) sur les gros volumes. SQLite : entiers déjà sur 64 bits.
+VERSION = "0007"
+DESCRIPTION = "revenue bigint"
+
+def upgrade(connection):
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("ALTER TABLE revenue ALTER COLUMN revenue TYPE bigint")
+
+def downgrade(connection):
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("ALTER TABLE revenue ALTER COLUMN revenue TYPE integer")
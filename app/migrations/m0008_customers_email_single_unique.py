@@ -0,0 +1,14 @@
+# Une seule unicité sur customers.email : ux_customers_email (migration 0004). Les bases créées
+# par create_all avant que le modèle déclare cet index portent aussi la contrainte anonyme
+# customers_email_key, vérifiée en double à chaque insertion. SQLite : l'index automatique fait
+# partie de la table et ne se supprime pas (recréer la base, ex. `python -m benchmarks seed`).
+VERSION = "0008"
+DESCRIPTION = "customers email single unique"
+
+def upgrade(connection):
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("ALTER TABLE customers DROP CONSTRAINT IF EXISTS customers_email_key")
+
+def downgrade(connection):
+    # ux_customers_email reste en place : rien à rétablir.
+    pass
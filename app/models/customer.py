@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from app.core.database import Base
@@ -10,3 +10,10 @@ class Customer(Base):
     name = Column(String, nullable=False)
     email = Column(String, nullable=False)
     image_url = Column(String, nullable=False)
+
+    # Index créés par les migrations 0004 (unicité des emails, cible du ON CONFLICT de
+    # /customers/bulk) et 0006 ; mêmes noms ici pour que create_all et migrate coïncident.
+    __table_args__ = (
+        Index("ux_customers_email", "email", unique=True),
+        Index("ix_customers_name_id", "name", "id"),
+    )
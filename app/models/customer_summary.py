@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+# Agrégats par client maintenus par app/crud/invoice.py (voir app/crud/customer_summary.py).
+class CustomerSummary(Base):
+    __tablename__ = "customer_summaries"
+
+    customer_id = Column(UUID(as_uuid=True), ForeignKey('customers.id'), primary_key=True)
+    total_invoices = Column(Integer, nullable=False, default=0)
+    total_pending = Column(BigInteger, nullable=False, default=0)
+    total_paid = Column(BigInteger, nullable=False, default=0)
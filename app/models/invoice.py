@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from app.core.database import Base
@@ -11,3 +11,10 @@ class Invoice(Base):
     amount = Column(Integer, nullable=False)
     status = Column(String, nullable=False)
     date = Column(Date, nullable=False)
+
+    # Index créés par la migration 0006 (mêmes noms : create_all et migrate ne se contredisent pas).
+    __table_args__ = (
+        Index("ix_invoices_customer_date", "customer_id", "date", "id"),
+        Index("ix_invoices_date_id", "date", "id"),
+        Index("ix_invoices_status_amount", "status", "amount"),
+    )
@@ -1,8 +1,16 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, BigInteger, String, Date
 from app.core.database import Base
 
+# Revenu mensuel ("YYYY-MM"), maintenu depuis les factures par app/crud/revenue_rollup.py.
 class Revenue(Base):
     __tablename__ = "revenue"
 
     month = Column(String, primary_key=True, unique=True, nullable=False)
-    revenue = Column(Integer, nullable=False)
+    revenue = Column(BigInteger, nullable=False)
+
+# Revenu journalier, maintenu si REVENUE_DAILY_ROLLUP est actif.
+class RevenueDaily(Base):
+    __tablename__ = "revenue_daily"
+
+    day = Column(Date, primary_key=True)
+    revenue = Column(BigInteger, nullable=False)
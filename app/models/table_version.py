@@ -0,0 +1,11 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+from app.core.database import Base
+
+# Compteur de modifications par table, incrémenté par les écritures de app/crud
+# (voir app/crud/table_version.py) ; source des ETag / Last-Modified des GET.
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
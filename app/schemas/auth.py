@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from uuid import UUID
+
+class LoginRequest(BaseModel):
+    email: str
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+class TokenInfo(BaseModel):
+    user_id: UUID
+    expires_at: int
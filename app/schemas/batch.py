@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from uuid import UUID
+from app.schemas.customer import Customer
+from app.schemas.invoice import Invoice
+from app.schemas.user import User
+
+# Nombre max d'identifiants par appel des endpoints /batch.
+BATCH_MAX_IDS = 500
+
+# Corps de POST /{customers,invoices,users}/batch.
+class BatchRequest(BaseModel):
+    ids: list[UUID] = Field(min_length=1, max_length=BATCH_MAX_IDS)
+
+# Lignes trouvées dans l'ordre de la demande, identifiants absents à part.
+class CustomerBatch(BaseModel):
+    items: list[Customer]
+    missing: list[UUID]
+
+class InvoiceBatch(BaseModel):
+    items: list[Invoice]
+    missing: list[UUID]
+
+class UserBatch(BaseModel):
+    items: list[User]
+    missing: list[UUID]
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from uuid import UUID
+from typing import Optional
+
+# Résultat d'une ligne d'import en masse : created, duplicate ou invalid.
+class BulkRowResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[UUID] = None
+    detail: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: list[BulkRowResult]
@@ -13,6 +13,23 @@ class CustomerCreate(CustomerBase):
 class Customer(CustomerBase):
     id: UUID = Field(default_factory=uuid4)
 
+# Ligne de la liste "customers" : client et agrégats de ses factures.
+class CustomerListItem(BaseModel):
+    id: UUID
+    name: str
+    email: str
+    image_url: str
+    total_invoices: int
+    total_pending: int
+    total_paid: int
+
+# Nouveau schéma pour l'enveloppe de "customers" (lignes et totaux en une requête)
+class CustomerPage(BaseModel):
+    items: list
+    totalItems: int
+    totalPages: int
+    nextCursor: Optional[str] = None
+
 # Nouveau schéma pour l'endpoint "customers/pages"
 class CustomerPagesResponse(BaseModel):
     totalPages: int
@@ -22,6 +22,13 @@ class InvoiceLatest(Invoice):
     email: str
     image_url: str
 
+# Nouveau schéma pour l'enveloppe de "invoices" (lignes et totaux en une requête)
+class InvoicePage(BaseModel):
+    items: list[InvoiceLatest]
+    totalItems: int
+    totalPages: int
+    nextCursor: Optional[str] = None
+
 # Nouveau schéma pour l'endpoint "invoices/pages"
 class InvoicePagesResponse(BaseModel):
     totalPages: int
@@ -34,3 +41,10 @@ class InvoiceUpdate(BaseModel):
 
     class Config:
         from_attributes = True
+
+# Série temporelle (/invoices/series) : tableaux parallèles, un élément par période.
+class InvoiceSeries(BaseModel):
+    granularity: str
+    buckets: list[date]
+    count: list[int]
+    amount: list[int]
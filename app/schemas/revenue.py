@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import date
 
 class RevenueBase(BaseModel):
     month: str
@@ -16,4 +17,10 @@ class RevenueUpdate(BaseModel):
     revenue: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Série temporelle (/revenue/series) : tableaux parallèles, un élément par période.
+class RevenueSeries(BaseModel):
+    granularity: str
+    buckets: list[date]
+    revenue: list[int]
@@ -15,6 +15,7 @@ class User(UserBase):
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[str] = None
+    password: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,56 @@
+import argparse
+import os
+import uvicorn
+from app.core.config import settings
+
+# Lancement en production : python -m app.server [--workers N] [--port P]
+#
+# uvicorn démarre N workers (un par cœur disponible par défaut) qui partagent le socket
+# d'écoute ; chacun se préchauffe (lifespan, app/core/lifecycle.py) avant d'accepter des
+# requêtes et journalise sa durée de démarrage. Sur SIGTERM : plus de nouvelles connexions,
+# les requêtes en cours ont SERVER_GRACEFUL_TIMEOUT secondes pour finir, puis les pools,
+# la connexion LISTEN et les processus de hachage sont fermés.
+
+def available_cores() -> int:
+    # Cœurs réellement attribués au processus (conteneur, taskset), sinon tous.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.server")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or available_cores())
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    # Plusieurs workers = plusieurs processus sans mémoire commune : le cache en mémoire
+    # (générations invalidées dans un seul worker) et une clé de jetons aléatoire par processus
+    # donneraient des réponses et des jetons incohérents d'un worker à l'autre.
+    if args.workers > 1:
+        problems = []
+        if settings.CACHE_BACKEND == "memory":
+            problems.append("CACHE_BACKEND=memory is per worker: use CACHE_BACKEND=redis or none")
+        if not settings.AUTH_SECRET:
+            problems.append("AUTH_SECRET is empty: set the same secret for all workers")
+        if problems:
+            parser.error(f"cannot start {args.workers} workers: " + "; ".join(problems) + " (or use --workers 1)")
+
+    # Connexions ouvertes au pire vers le primaire : chaque worker a son propre pool.
+    max_connections = args.workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    print(f"Starting {args.workers} workers on {args.host}:{args.port} (up to {max_connections} database connections)")
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        lifespan="on",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+
+if __name__ == "__main__":
+    main()
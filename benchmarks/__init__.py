@@ -0,0 +1,2 @@
+# Suite de benchmarks : jeu de données déterministe (dataset.py) et pilote de charge
+# en processus via l'application ASGI (driver.py). Voir python -m benchmarks --help.
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from app.core.config import settings
+from app.core.database import engine
+from benchmarks import coalesce, dataset, driver, serialization
+
+# python -m benchmarks seed --invoices 100000
+# python -m benchmarks run --mix mixed --output results.json [--baseline baseline.json]
+# python -m benchmarks serialization --rows 50
+# python -m benchmarks coalesce --concurrency 100
+# La base visée est celle de DATABASE_URL (SQLite ou PostgreSQL local).
+
+def seed(args):
+    started = time.perf_counter()
+    def progress(table, count):
+        print(f"  {table}: {count}", file=sys.stderr)
+    counts = dataset.seed(
+        engine,
+        invoices=args.invoices,
+        customers=args.customers,
+        users=args.users,
+        seed=args.seed,
+        reset=not args.append,
+        on_progress=progress,
+    )
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f} s")
+
+def run(args):
+    from app.main import app
+
+    result = asyncio.run(driver.run(
+        app,
+        mix=args.mix,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        seed=args.seed,
+    ))
+    print(driver.format_report(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = driver.compare(result, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regression against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+def serialize(args):
+    for result in serialization.run(rows=args.rows, iterations=args.iterations):
+        print(f"{result['case']:<16}{result['rows']:>7} rows  legacy {result['legacy_us']:>10} us  "
+              f"fast {result['fast_us']:>10} us  x{result['speedup']}  (identical output)")
+
+def coalesce_requests(args):
+    from app.main import app
+
+    failures = asyncio.run(coalesce.check(args.concurrency))
+    print("single-flight check: " + ("; ".join(failures) if failures else f"ok ({args.concurrency} concurrent loads, value and error)"))
+    result = asyncio.run(coalesce.run(app, concurrency=args.concurrency))
+    loads = result["loads"]
+    print(f"single-flight     {loads['requests']:>5} loads     {loads['queries']:>4} queries")
+    for endpoint in result["endpoints"]:
+        coalesced, uncoalesced = endpoint["coalesced"], endpoint["uncoalesced"]
+        print(f"{endpoint['path']:<18}{endpoint['requests']:>5} requests  "
+              f"coalesced {coalesced['queries']:>4} queries {coalesced['ms']:>9} ms ({coalesced['collapsed']} collapsed)  "
+              f"uncoalesced {uncoalesced['queries']:>4} queries {uncoalesced['ms']:>9} ms  statuses {coalesced['statuses']}")
+    # N chargements identiques simultanés : un seul appel du chargeur, une seule requête SQL.
+    if failures or loads["queries"] != 1:
+        sys.exit(1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Remplit la base avec un jeu de données déterministe.")
+    seed_parser.add_argument("--invoices", type=int, default=10_000, help="Nombre de factures (10k à 10M).")
+    seed_parser.add_argument("--customers", type=int, help="Nombre de clients (défaut : factures / 50).")
+    seed_parser.add_argument("--users", type=int, default=10)
+    seed_parser.add_argument("--seed", type=int, default=42)
+    seed_parser.add_argument("--append", action="store_true", help="Ajoute aux tables existantes sans les recréer.")
+    seed_parser.set_defaults(handler=seed)
+
+    run_parser = commands.add_parser("run", help="Envoie un mix de requêtes à l'application ASGI.")
+    run_parser.add_argument("--mix", choices=sorted(driver.MIXES), default="mixed")
+    run_parser.add_argument("--requests", type=int, default=2000)
+    run_parser.add_argument("--concurrency", type=int, default=10)
+    run_parser.add_argument("--warmup", type=int, default=50)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="Écrit les résultats en JSON.")
+    run_parser.add_argument("--baseline", help="Résultats JSON de référence : échec si régression.")
+    run_parser.add_argument("--tolerance", type=float, default=0.2, help="Dégradation tolérée (0.2 = 20 %%).")
+    run_parser.set_defaults(handler=run)
+
+    serialization_parser = commands.add_parser(
+        "serialization", help="Compare la sérialisation FastAPI et le chemin rapide (sans base)."
+    )
+    serialization_parser.add_argument("--rows", type=int, default=50)
+    serialization_parser.add_argument("--iterations", type=int, default=1000)
+    serialization_parser.set_defaults(handler=serialize)
+
+    coalesce_parser = commands.add_parser(
+        "coalesce", help="Requêtes identiques simultanées : requêtes SQL exécutées avec et sans regroupement."
+    )
+    coalesce_parser.add_argument(
+        "--concurrency", type=int, default=settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+        help="Requêtes simultanées (défaut : DB_POOL_SIZE + DB_MAX_OVERFLOW, au-delà elles attendent une connexion).",
+    )
+    coalesce_parser.set_defaults(handler=coalesce_requests)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.cache import response_cache
+from app.core.coalesce import SingleFlight, single_flight
+from app.core.database import session_scope
+from app.core.lifecycle import engines
+from app.crud import invoice as crud_invoice
+from benchmarks.driver import call
+
+# Regroupement des lectures (python -m benchmarks coalesce), requêtes SQL comptées sur tous
+# les moteurs :
+# - single-flight seul : N chargements identiques simultanés (totaux par statut) doivent
+#   exécuter une seule requête ;
+# - endpoints : N requêtes HTTP identiques simultanées, avec puis sans regroupement. Les
+#   requêtes arrivant pendant un chargement le partagent ; celles retardées (attente d'une
+#   connexion pour la lecture des versions) en relancent un.
+# Le cache des réponses est contourné pendant la mesure (seul le regroupement est mesuré) ;
+# les lectures de table_versions (GET conditionnels, une par requête) ne sont pas comptées.
+# Avant la mesure, check() vérifie le single-flight seul, sans base : N chargements identiques
+# simultanés exécutent le chargeur une fois, une exception atteint chaque appelant et la clé
+# est relancée ensuite.
+
+PATHS = ("/invoices/status", "/invoices/latest", "/revenue/")
+
+class LoadError(Exception):
+    pass
+
+async def concurrent_loads(flight: SingleFlight, key: str, concurrency: int, loader) -> list:
+    # Les N appels sont en attente (un leader, N - 1 regroupés) avant que le chargeur ne finisse.
+    release = asyncio.Event()
+
+    async def gated():
+        await release.wait()
+        return await loader()
+
+    started = flight.leaders + flight.collapsed
+    tasks = [asyncio.ensure_future(flight.do(key, gated)) for _ in range(concurrency)]
+    while flight.leaders + flight.collapsed < started + concurrency:
+        await asyncio.sleep(0)
+    release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+async def check(concurrency: int) -> list:
+    # Renvoie les échecs (liste vide : single-flight conforme).
+    flight = SingleFlight(True)
+    failures = []
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        return {"call": calls}
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        raise LoadError("load failed")
+
+    results = await concurrent_loads(flight, "check:value", concurrency, load)
+    if calls != 1:
+        failures.append(f"{concurrency} identical loads ran the loader {calls} times (expected 1)")
+    if any(result is not results[0] for result in results):
+        failures.append("callers did not all receive the leader's result")
+
+    calls = 0
+    results = await concurrent_loads(flight, "check:error", concurrency, fail)
+    if calls != 1:
+        failures.append(f"{concurrency} identical failing loads ran the loader {calls} times (expected 1)")
+    if not all(isinstance(result, LoadError) for result in results):
+        failures.append("the loader's exception did not reach every caller")
+
+    # Rien n'est gardé après un échec : l'appel suivant relance le chargement.
+    calls = 0
+    leftover = bool(flight.calls)
+    try:
+        value = await flight.do("check:error", load)
+    except LoadError:
+        value = None
+    if leftover or value != {"call": 1} or calls != 1:
+        failures.append("a failed load left its key in flight")
+    return failures
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, connection, cursor, statement, parameters, context, executemany):
+        if "table_versions" not in statement:
+            self.count += 1
+
+async def measure(app, path: str, concurrency: int, counter: StatementCounter) -> dict:
+    counter.count = 0
+    collapsed = single_flight.collapsed
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(call(app, "GET", path, "") for _ in range(concurrency)))
+    return {
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+        "queries": counter.count,
+        "collapsed": single_flight.collapsed - collapsed,
+        "statuses": sorted({status for status, _ in responses}),
+    }
+
+async def measure_loads(concurrency: int, counter: StatementCounter) -> int:
+    async def load():
+        async with session_scope(read_only=True) as db:
+            return await crud_invoice.status_totals(db)
+
+    counter.count = 0
+    await asyncio.gather(*(single_flight.do("benchmarks:status", load) for _ in range(concurrency)))
+    return counter.count
+
+async def run(app, concurrency: int = 100, paths: tuple = PATHS) -> dict:
+    counter = StatementCounter()
+    sync_engines = [db_engine.sync_engine if isinstance(db_engine, AsyncEngine) else db_engine for db_engine in engines()]
+    for sync_engine in sync_engines:
+        event.listen(sync_engine, "before_cursor_execute", counter)
+    backend, enabled = response_cache.backend, single_flight.enabled
+    response_cache.backend = None
+    try:
+        single_flight.enabled = True
+        loads = await measure_loads(concurrency, counter)
+        results = []
+        for path in paths:
+            single_flight.enabled = True
+            single = await measure(app, path, 1, counter)
+            coalesced = await measure(app, path, concurrency, counter)
+            single_flight.enabled = False
+            uncoalesced = await measure(app, path, concurrency, counter)
+            results.append({
+                "path": path,
+                "requests": concurrency,
+                "single_queries": single["queries"],
+                "coalesced": coalesced,
+                "uncoalesced": uncoalesced,
+            })
+        return {"loads": {"requests": concurrency, "queries": loads}, "endpoints": results}
+    finally:
+        response_cache.backend, single_flight.enabled = backend, enabled
+        for sync_engine in sync_engines:
+            event.remove(sync_engine, "before_cursor_execute", counter)
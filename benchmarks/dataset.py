@@ -0,0 +1,115 @@
+import random
+import uuid
+from datetime import date, timedelta
+from sqlalchemy import insert
+from app import migrations
+from app.core.database import Base
+from app.crud.customer_summary import rebuild_customer_summaries
+from app.crud.revenue_rollup import backfill_revenue
+from app.crud.table_version import bump_statement
+from app.models.customer import Customer
+from app.models.customer_summary import CustomerSummary  # noqa: F401 (table dans Base.metadata)
+from app.models.invoice import Invoice
+from app.models.revenue import Revenue, RevenueDaily  # noqa: F401
+from app.models.user import User
+
+# Générateur de données déterministe : même graine + mêmes tailles = mêmes lignes
+# (identifiants compris), pour comparer des mesures entre deux exécutions.
+
+FIRST_NAMES = (
+    "Alice", "Bruno", "Chloé", "David", "Emma", "François", "Gabriel", "Hugo", "Inès", "Jules",
+    "Karim", "Léa", "Manon", "Nathan", "Olivia", "Paul", "Quentin", "Rose", "Sarah", "Théo",
+)
+LAST_NAMES = (
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+    "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier",
+)
+STATUSES = ("paid", "pending")
+START_DATE = date(2022, 1, 1)
+DAYS = 3 * 365
+CHUNK_SIZE = 10_000
+
+def make_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+def customer_rows(rng: random.Random, count: int):
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "id": make_uuid(rng),
+            "name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}.{i}@example.com",
+            "image_url": f"/customers/{i % 100}.png",
+        }
+
+def invoice_rows(rng: random.Random, count: int, customer_ids: list):
+    for _ in range(count):
+        yield {
+            "id": make_uuid(rng),
+            "customer_id": rng.choice(customer_ids),
+            "amount": rng.randint(100, 500_000),
+            # Un tiers en attente, comme les données de démonstration.
+            "status": STATUSES[rng.random() < 1 / 3],
+            "date": START_DATE + timedelta(days=rng.randrange(DAYS)),
+        }
+
+def user_rows(rng: random.Random, count: int):
+    for i in range(count):
+        yield {
+            "id": make_uuid(rng),
+            "name": f"User {i}",
+            "email": f"user{i}@example.com",
+            "password": f"password-{i}",
+        }
+
+def insert_chunks(engine, model, rows, on_progress=None) -> int:
+    # Une transaction par lot : la mémoire et la taille des transactions restent bornées.
+    total, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            with engine.begin() as connection:
+                connection.execute(insert(model), chunk)
+            total += len(chunk)
+            chunk = []
+            if on_progress:
+                on_progress(model.__tablename__, total)
+    if chunk:
+        with engine.begin() as connection:
+            connection.execute(insert(model), chunk)
+        total += len(chunk)
+    return total
+
+def reset_schema(engine):
+    # Repart d'un schéma vide : tables de l'application puis migrations.
+    with engine.begin() as connection:
+        Base.metadata.drop_all(connection)
+        migrations.metadata.drop_all(connection)
+        Base.metadata.create_all(connection)
+    migrations.upgrade(engine)
+
+def seed(engine, invoices: int, customers: int = None, users: int = 10, seed: int = 42,
+         reset: bool = True, on_progress=None) -> dict:
+    customers = customers or max(invoices // 50, 1)
+    rng = random.Random(seed)
+    if reset:
+        reset_schema(engine)
+
+    customer_ids = []
+    def collect_ids(rows):
+        for row in rows:
+            customer_ids.append(row["id"])
+            yield row
+
+    insert_chunks(engine, Customer, collect_ids(customer_rows(rng, customers)), on_progress)
+    insert_chunks(engine, Invoice, invoice_rows(rng, invoices, customer_ids), on_progress)
+    insert_chunks(engine, User, user_rows(rng, users), on_progress)
+
+    # Agrégats dérivés recalculés en un passage (insertions directes, sans app/crud).
+    with engine.begin() as connection:
+        rebuild_customer_summaries(connection)
+        months = backfill_revenue(connection)
+        # Nouvelles données : les ETag déjà servis ne doivent plus correspondre.
+        connection.execute(bump_statement("customer_summaries", "customers", "invoices", "revenue", "users"))
+
+    return {"customers": customers, "invoices": invoices, "users": users, "revenue_months": months}
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from urllib.parse import urlencode
+from sqlalchemy import func, select
+from app.core.database import session_scope
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.revenue import Revenue
+from app.models.user import User
+
+# Pilote de charge en processus : les requêtes sont envoyées directement à l'application
+# ASGI (sans réseau ni client HTTP), la mesure couvre routage, validation, base et sérialisation.
+#
+# Chaque scénario produit une requête réaliste pour une route de app/api/endpoints ;
+# un mix pondère les scénarios. La suite de requêtes est tirée d'une graine fixe.
+
+SEARCH_TERMS = ("ali", "martin", "léa", "dubois", "example", "paid", "pend", "1500", "1000-5000", "zz")
+PAGE_LIMITS = (10, 20, 50)
+
+class Context:
+    # Échantillon de la base, chargé avant la mesure.
+    def __init__(self, customer_ids, invoice_ids, months, user_ids, login_emails, invoice_count, customer_count):
+        self.customer_ids = customer_ids
+        self.invoice_ids = invoice_ids
+        self.months = months
+        self.user_ids = user_ids
+        self.login_emails = login_emails
+        self.invoice_count = invoice_count
+        self.customer_count = customer_count
+
+async def load_context(sample_size: int = 1000) -> Context:
+    async with session_scope() as db:
+        return Context(
+            customer_ids=[str(v) for v in (await db.execute(select(Customer.id).limit(sample_size))).scalars()],
+            invoice_ids=[str(v) for v in (await db.execute(select(Invoice.id).limit(sample_size))).scalars()],
+            months=list((await db.execute(select(Revenue.month))).scalars()),
+            user_ids=[str(v) for v in (await db.execute(select(User.id).limit(sample_size))).scalars()],
+            # Comptes du jeu de données uniquement (users.create en ajoute d'autres).
+            login_emails=list((await db.execute(
+                select(User.email).where(User.email.like("user%@example.com")).limit(sample_size)
+            )).scalars()),
+            invoice_count=await db.scalar(select(func.count(Invoice.id))),
+            customer_count=await db.scalar(select(func.count(Customer.id))),
+        )
+
+def deep_page(rng, total: int, limit: int) -> int:
+    # Seconde moitié des pages : le coût de l'offset est visible.
+    last_page = max(math.ceil(total / limit), 1)
+    return rng.randint(max(last_page // 2, 1), last_page)
+
+def new_invoice(rng, ctx):
+    return {
+        "customer_id": rng.choice(ctx.customer_ids),
+        "amount": rng.randint(100, 500_000),
+        "status": rng.choice(("paid", "pending")),
+        "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    }
+
+def new_customer(rng):
+    key = uuid.UUID(int=rng.getrandbits(128)).hex[:12]
+    return {"name": f"Bench {key}", "email": f"bench.{key}@example.com", "image_url": "/customers/0.png"}
+
+def login_credentials(rng, ctx):
+    # Identifiants générés par benchmarks/dataset.py (user_rows).
+    email = rng.choice(ctx.login_emails)
+    return {"email": email, "password": "password-" + email[len("user"):-len("@example.com")]}
+
+# nom -> (méthode, fabrique(rng, ctx) -> (chemin, paramètres, corps JSON ou None))
+SCENARIOS = {
+    # Tableau de bord (rafraîchi en boucle par le front).
+    "invoices.status": ("GET", lambda rng, ctx: ("/invoices/status", {}, None)),
+    "invoices.latest": ("GET", lambda rng, ctx: ("/invoices/latest", {}, None)),
+    "invoices.count": ("GET", lambda rng, ctx: ("/invoices/count", {}, None)),
+    "customers.count": ("GET", lambda rng, ctx: ("/customers/count", {}, None)),
+    "revenue.list": ("GET", lambda rng, ctx: ("/revenue/", {}, None)),
+    # Listes et recherche.
+    "invoices.list": ("GET", lambda rng, ctx: (
+        "/invoices", {"page": rng.randint(1, 5), "limit": rng.choice(PAGE_LIMITS)}, None)),
+    "invoices.search": ("GET", lambda rng, ctx: (
+        "/invoices", {"query": rng.choice(SEARCH_TERMS), "page": rng.randint(1, 3)}, None)),
+    "invoices.deep_page": ("GET", lambda rng, ctx: (
+        "/invoices", {"page": deep_page(rng, ctx.invoice_count, 50), "limit": 50}, None)),
+    # Client mobile : identifiants et montants seulement (?fields=, sans jointure).
+    "invoices.sparse": ("GET", lambda rng, ctx: (
+        "/invoices", {"page": rng.randint(1, 5), "limit": 50, "fields": "id,amount,status,date"}, None)),
+    "invoices.pages": ("GET", lambda rng, ctx: ("/invoices/pages", {"query": rng.choice(SEARCH_TERMS)}, None)),
+    "invoices.search_count": ("GET", lambda rng, ctx: ("/invoices/count", {"query": rng.choice(SEARCH_TERMS)}, None)),
+    "invoices.one": ("GET", lambda rng, ctx: (f"/invoices/{rng.choice(ctx.invoice_ids)}", {}, None)),
+    "customers.list": ("GET", lambda rng, ctx: (
+        "/customers", {"page": rng.randint(1, 5), "limit": rng.choice(PAGE_LIMITS)}, None)),
+    "customers.search": ("GET", lambda rng, ctx: ("/customers", {"query": rng.choice(SEARCH_TERMS)}, None)),
+    "customers.deep_page": ("GET", lambda rng, ctx: (
+        "/customers", {"page": deep_page(rng, ctx.customer_count, 50), "limit": 50}, None)),
+    "customers.pages": ("GET", lambda rng, ctx: ("/customers/pages", {"query": rng.choice(SEARCH_TERMS)}, None)),
+    "customers.all": ("GET", lambda rng, ctx: ("/customers/all", {}, None)),
+    "customers.one": ("GET", lambda rng, ctx: (f"/customers/{rng.choice(ctx.customer_ids)}", {}, None)),
+    # Résolution d'une liste d'identifiants en un appel (au lieu de N appels .one).
+    "customers.batch": ("GET", lambda rng, ctx: (
+        "/customers/batch", {"ids": ",".join(rng.sample(ctx.customer_ids, min(20, len(ctx.customer_ids))))}, None)),
+    "invoices.batch": ("POST", lambda rng, ctx: (
+        "/invoices/batch", {}, {"ids": rng.sample(ctx.invoice_ids, min(50, len(ctx.invoice_ids)))})),
+    "revenue.one": ("GET", lambda rng, ctx: (f"/revenue/{rng.choice(ctx.months)}", {}, None)),
+    "users.list": ("GET", lambda rng, ctx: ("/users/", {}, None)),
+    "users.one": ("GET", lambda rng, ctx: (f"/users/{rng.choice(ctx.user_ids)}", {}, None)),
+    "metrics": ("GET", lambda rng, ctx: ("/metrics", {}, None)),
+    # Exports complets (coûteux, mix "export" uniquement).
+    "invoices.export": ("GET", lambda rng, ctx: ("/invoices/export", {"query": rng.choice(SEARCH_TERMS)}, None)),
+    "customers.export": ("GET", lambda rng, ctx: ("/customers/export", {"format": "ndjson"}, None)),
+    # Écritures.
+    "invoices.create": ("POST", lambda rng, ctx: ("/invoices", {}, new_invoice(rng, ctx))),
+    "invoices.update": ("PATCH", lambda rng, ctx: (
+        f"/invoices/{rng.choice(ctx.invoice_ids)}", {}, {"status": rng.choice(("paid", "pending"))})),
+    "invoices.bulk": ("POST", lambda rng, ctx: ("/invoices/bulk", {}, [new_invoice(rng, ctx) for _ in range(20)])),
+    "customers.create": ("POST", lambda rng, ctx: ("/customers", {}, new_customer(rng))),
+    "customers.update": ("PATCH", lambda rng, ctx: (
+        f"/customers/{rng.choice(ctx.customer_ids)}", {}, {"image_url": f"/customers/{rng.randint(0, 99)}.png"})),
+    "customers.bulk": ("POST", lambda rng, ctx: ("/customers/bulk", {}, [new_customer(rng) for _ in range(20)])),
+    "revenue.update": ("PATCH", lambda rng, ctx: (
+        f"/revenue/{rng.choice(ctx.months)}", {}, {"revenue": rng.randint(0, 10_000_000)})),
+    "users.create": ("POST", lambda rng, ctx: ("/users/", {}, {
+        "name": "Bench", "email": f"bench.{uuid.UUID(int=rng.getrandbits(128)).hex[:12]}@example.com",
+        "password": "bench-password"})),
+    "users.update": ("PATCH", lambda rng, ctx: (f"/users/{rng.choice(ctx.user_ids)}", {}, {"name": "Bench"})),
+    # Hachage dans le pool de processus.
+    "auth.login": ("POST", lambda rng, ctx: ("/auth/login", {}, login_credentials(rng, ctx))),
+}
+
+DASHBOARD = {"invoices.status": 3, "invoices.latest": 3, "invoices.count": 2, "customers.count": 2, "revenue.list": 2}
+BROWSE = {
+    "invoices.list": 6, "invoices.search": 6, "invoices.deep_page": 2, "invoices.pages": 2,
+    "invoices.search_count": 2, "invoices.one": 3, "customers.list": 4, "customers.search": 4,
+    "customers.deep_page": 1, "customers.pages": 2, "customers.all": 1, "customers.one": 3,
+    "customers.batch": 1, "invoices.batch": 1, "invoices.sparse": 2,
+    "revenue.one": 1, "users.list": 1, "users.one": 1, "metrics": 1,
+}
+WRITE = {
+    "invoices.create": 3, "invoices.update": 3, "invoices.bulk": 1, "customers.create": 1,
+    "customers.update": 1, "customers.bulk": 1, "revenue.update": 1, "users.create": 1, "users.update": 1, "auth.login": 1,
+}
+MIXES = {
+    "dashboard": DASHBOARD,
+    "browse": BROWSE,
+    "read": {**DASHBOARD, **BROWSE},
+    "write": WRITE,
+    # Toutes les routes sauf les exports : lectures majoritaires, ~10 % d'écritures.
+    "mixed": {**{name: weight * 3 for name, weight in {**DASHBOARD, **BROWSE}.items()}, **WRITE},
+    "export": {"invoices.export": 1, "customers.export": 1},
+}
+
+def build_plan(mix: str, count: int, seed: int, ctx: Context) -> list:
+    rng = random.Random(seed)
+    weights = MIXES[mix]
+    names = rng.choices(list(weights), weights=list(weights.values()), k=count)
+    plan = []
+    for name in names:
+        method, build = SCENARIOS[name]
+        path, params, body = build(rng, ctx)
+        plan.append((name, method, path, urlencode(params), body))
+    return plan
+
+async def call(app, method: str, path: str, query_string: str, body=None):
+    # Requête ASGI directe ; renvoie (statut, taille du corps).
+    payload = b"" if body is None else json.dumps(body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"benchmark"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    received = False
+    finished = asyncio.Event()
+    status, size = 0, 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return status, size
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    # Rang le plus proche.
+    if not sorted_values:
+        return 0.0
+    index = min(max(math.ceil(fraction * len(sorted_values)) - 1, 0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+async def run(app, mix: str = "mixed", requests: int = 2000, concurrency: int = 10,
+              warmup: int = 50, seed: int = 42) -> dict:
+    ctx = await load_context()
+    plan = build_plan(mix, warmup + requests, seed, ctx)
+    for name, method, path, query_string, body in plan[:warmup]:
+        await call(app, method, path, query_string, body)
+
+    timings = {}
+    errors = {}
+    queue = iter(plan[warmup:])
+
+    async def worker():
+        for name, method, path, query_string, body in queue:
+            start = time.perf_counter()
+            status, _ = await call(app, method, path, query_string, body)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            timings.setdefault(name, []).append(elapsed_ms)
+            if status >= 400:
+                errors[name] = errors.get(name, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - started
+
+    endpoints = {}
+    for name in sorted(timings):
+        values = sorted(timings[name])
+        endpoints[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "rps": round(len(values) / wall_time, 2),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": round(percentile(values, 0.50), 3),
+            "p95_ms": round(percentile(values, 0.95), 3),
+            "p99_ms": round(percentile(values, 0.99), 3),
+        }
+    return {
+        "meta": {
+            "mix": mix,
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed": seed,
+            "invoices": ctx.invoice_count,
+            "customers": ctx.customer_count,
+        },
+        "total": {
+            "requests": requests,
+            "errors": sum(errors.values()),
+            "wall_time_s": round(wall_time, 3),
+            "rps": round(requests / wall_time, 2),
+        },
+        "endpoints": endpoints,
+    }
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    # Régressions par rapport à une exécution de référence (même mix, même jeu de données).
+    regressions = []
+    for name, current in result["endpoints"].items():
+        reference = baseline.get("endpoints", {}).get(name)
+        if reference is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if current[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {reference[metric]} -> {current[metric]}")
+        if current["errors"] > reference["errors"]:
+            regressions.append(f"{name}: errors {reference['errors']} -> {current['errors']}")
+    reference_rps = baseline.get("total", {}).get("rps")
+    if reference_rps and result["total"]["rps"] < reference_rps * (1 - tolerance):
+        regressions.append(f"total: rps {reference_rps} -> {result['total']['rps']}")
+    return regressions
+
+def format_report(result: dict) -> str:
+    lines = [f"{'endpoint':<24}{'count':>7}{'err':>5}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for name, stats in result["endpoints"].items():
+        lines.append(
+            f"{name:<24}{stats['count']:>7}{stats['errors']:>5}{stats['rps']:>10}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+    total = result["total"]
+    lines.append(f"total: {total['requests']} requests in {total['wall_time_s']} s, "
+                 f"{total['rps']} req/s, {total['errors']} errors")
+    return "\n".join(lines)
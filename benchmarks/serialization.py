@@ -0,0 +1,79 @@
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from pydantic import TypeAdapter
+from app.core import serialization
+from app.schemas.customer import Customer
+from app.schemas.invoice import InvoiceLatest
+
+# Micro-benchmark de la sérialisation des listes : chemin FastAPI (dict par ligne avec
+# isoformat(), validation response_model puis dump_json) contre le chemin rapide
+# (app/core/serialization.py). Les deux sorties sont comparées octet pour octet.
+
+def invoice_rows(rng: random.Random, count: int) -> list:
+    # Tuples dans l'ordre des colonnes sélectionnées (schéma InvoiceLatest).
+    return [
+        (
+            uuid.UUID(int=rng.getrandbits(128), version=4),
+            rng.randint(100, 500_000),
+            rng.choice(("paid", "pending")),
+            date(2022, 1, 1) + timedelta(days=rng.randrange(1000)),
+            uuid.UUID(int=rng.getrandbits(128), version=4),
+            f"Client {i} Éloïse",
+            f"client.{i}@example.com",
+            f"/customers/{i % 100}.png",
+        )
+        for i in range(count)
+    ]
+
+def customer_rows(rng: random.Random, count: int) -> list:
+    return [
+        (f"Client {i}", f"client.{i}@example.com", f"/customers/{i % 100}.png", uuid.UUID(int=rng.getrandbits(128), version=4))
+        for i in range(count)
+    ]
+
+def legacy_invoices(adapter, rows) -> bytes:
+    fields = serialization.schema_fields(InvoiceLatest)
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        item["date"] = item["date"].isoformat()
+        items.append(item)
+    return adapter.dump_json(adapter.validate_python(items))
+
+def legacy_customers(adapter, rows) -> bytes:
+    fields = serialization.schema_fields(Customer)
+    return adapter.dump_json(adapter.validate_python([dict(zip(fields, row)) for row in rows]))
+
+def fast(schema, rows) -> bytes:
+    return serialization.dumps(serialization.rows_to_items(schema, rows))
+
+def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+def run(rows: int = 50, iterations: int = 1000, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    cases = [
+        ("invoices", InvoiceLatest, invoice_rows(rng, rows), legacy_invoices, TypeAdapter(list[InvoiceLatest])),
+        ("customers/all", Customer, customer_rows(rng, rows), legacy_customers, TypeAdapter(list[Customer])),
+    ]
+    results = []
+    for name, schema, data, legacy, adapter in cases:
+        legacy_bytes, fast_bytes = legacy(adapter, data), fast(schema, data)
+        if legacy_bytes != fast_bytes:
+            raise AssertionError(f"{name}: fast serialization output differs from FastAPI output")
+        legacy_us = timed(lambda: legacy(adapter, data), iterations)
+        fast_us = timed(lambda: fast(schema, data), iterations)
+        results.append({
+            "case": name,
+            "rows": rows,
+            "legacy_us": round(legacy_us, 1),
+            "fast_us": round(fast_us, 1),
+            "speedup": round(legacy_us / fast_us, 2),
+            "orjson": serialization.orjson is not None,
+        })
+    return results